@@ -0,0 +1,201 @@
+"""
+End-to-end benchmark of Collector.collect against the offline replay server.
+
+Starts benchmark.replay_server in a subprocess, points the plugin at it through
+GOOGLE_API_ROOT_URL / RECOMMENDATION_TYPE_DOCS_URL and reports wall time, time
+to the first cloud service, API calls per service, peak RSS and resource count.
+
+    python -m benchmark.collect_benchmark --assets 200000 --recommendations 10000 \
+        --iam-members 5000 --latency 0.05
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmark.replay_server import Scenario
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def start_replay_server(args: argparse.Namespace) -> tuple:
+    port = _get_free_port()
+    command = [sys.executable, "-m", "benchmark.replay_server", "--port", str(port)]
+    for name, value in vars(Scenario.from_arguments(args)).items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+
+    env = dict(os.environ)
+    python_path = [ROOT_DIR, SRC_DIR]
+    if env.get("PYTHONPATH"):
+        python_path.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(python_path)
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            _get_json(f"{base_url}/_stats")
+            return process, base_url
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("replay server did not start")
+            time.sleep(0.1)
+
+
+def make_secret_data(base_url: str, project_id: str, organization_id: str) -> dict:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("utf-8")
+    return {
+        "type": "service_account",
+        "project_id": project_id,
+        "organization_id": organization_id,
+        "private_key_id": "replay",
+        "private_key": pem,
+        "client_email": f"benchmark@{project_id}.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": f"{base_url}/token",
+    }
+
+
+def configure_plugin(base_url: str, cache_dir: str, trace_dir: str = None):
+    # global_conf reads these at import time, so they are set before the
+    # plugin is imported.
+    os.environ["GOOGLE_API_ROOT_URL"] = f"{base_url}/{{service}}/"
+    os.environ["RECOMMENDATION_TYPE_DOCS_URL"] = f"{base_url}/docs/recommenders"
+    os.environ["RECOMMENDER_COLLECTOR_CACHE_DIR"] = cache_dir
+    if trace_dir:
+        os.environ["RECOMMENDER_COLLECTOR_TRACE_EXPORTERS"] = "chrome"
+        os.environ["RECOMMENDER_COLLECTOR_TRACE_DIR"] = os.path.abspath(trace_dir)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    from spaceone.core import config
+
+    config.set_default_conf()
+    config.init_conf(package="cloudforet")
+
+    import cloudforet.plugin.main  # noqa: F401 registers the plugin methods
+
+
+def run_verify(options: dict, secret_data: dict) -> dict:
+    from spaceone.inventory.plugin.collector.service.collector_service import (
+        CollectorService,
+    )
+
+    verify = CollectorService.get_plugin_method("verify")
+    started_at = time.monotonic()
+    verify({"options": options, "secret_data": secret_data, "schema": None})
+    return {"wall_time": time.monotonic() - started_at}
+
+
+def run_collect(options: dict, secret_data: dict, task_options: dict = None) -> dict:
+    from spaceone.inventory.plugin.collector.service.collector_service import (
+        CollectorService,
+    )
+
+    collect = CollectorService.get_plugin_method("collect")
+    params = {
+        "options": options,
+        "secret_data": secret_data,
+        "schema": None,
+        "task_options": task_options,
+    }
+
+    started_at = time.monotonic()
+    first_cloud_service = None
+    counts = {}
+    for response in collect(params):
+        resource_type = response.get("resource_type")
+        key = resource_type if response.get("state", "SUCCESS") == "SUCCESS" else "error"
+        counts[key] = counts.get(key, 0) + 1
+        if first_cloud_service is None and resource_type == "inventory.CloudService":
+            first_cloud_service = time.monotonic() - started_at
+    return {
+        "wall_time": time.monotonic() - started_at,
+        "time_to_first_cloud_service": first_cloud_service,
+        "resources": counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--options", type=json.loads, default={}, help="collect options as JSON")
+    parser.add_argument("--runs", type=int, default=1, help="warm runs reuse the plugin caches")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument(
+        "--trace-dir", help="write a Chrome trace (chrome://tracing) of every run here"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="run Collector.verify before the first collect"
+    )
+    Scenario.add_arguments(parser)
+    parser.set_defaults(assets=200000, recommendations=10000, iam_members=5000)
+    args = parser.parse_args()
+
+    process, base_url = start_replay_server(args)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configure_plugin(base_url, cache_dir, args.trace_dir)
+            from cloudforet.plugin.connector.rate_limiter import RateLimiter
+
+            secret_data = make_secret_data(base_url, args.project_id, args.organization_id)
+            verify = None
+            if args.verify:
+                verify = run_verify(args.options, secret_data)
+                verify["api"] = _get_json(f"{base_url}/_stats")
+
+            runs = []
+            for _ in range(args.runs):
+                urllib.request.urlopen(f"{base_url}/_reset", timeout=10).close()
+                result = run_collect(args.options, secret_data)
+                result["api"] = _get_json(f"{base_url}/_stats")
+                runs.append(result)
+
+            report = {
+                "scenario": vars(Scenario.from_arguments(args)),
+                "options": args.options,
+                "verify": verify,
+                "runs": runs,
+                "rate_limiter": RateLimiter.get_all_stats(),
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }
+    finally:
+        process.terminate()
+        process.wait()
+
+    dumped = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(dumped)
+    print(dumped)
+
+
+if __name__ == "__main__":
+    main()
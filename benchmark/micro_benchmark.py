@@ -0,0 +1,385 @@
+"""
+Microbenchmarks of the CPU bound transformation paths of the managers.
+
+Every stage runs on deterministic synthetic data (benchmark.replay_server.ReplayData)
+with stub connectors, so no network is involved:
+
+    cloud_asset_locations   _create_parents_and_location_map_by_cloud_asset_api
+    recommender_locations   _add_locations_to_recommender_map
+    parse_recommendations   _parse_recommendations (_parse_recommendation)
+    overall_values          _get_overall_values
+    permission_insights     IAM _parse_permission_usage_insights
+    iam_aggregation         IAM create_cloud_service
+    asset_page_decode       response model decoding of a Cloud Asset page (full content)
+    role_page_decode        response model decoding of an IAM roles page (FULL view)
+
+The decode stages use the decoder of RECOMMENDER_COLLECTOR_JSON_DECODER, run
+them once with "json" and compare against the default to see the savings.
+
+    python -m benchmark.micro_benchmark --save-baseline baseline.json
+    python -m benchmark.micro_benchmark --baseline baseline.json --max-regression 0.1
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from unittest import mock
+
+from benchmark.replay_server import ReplayData, Scenario
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+STAGE_SIZES = {
+    "cloud_asset_locations": [10000, 100000, 500000],
+    "recommender_locations": [10000, 100000, 500000],
+    "parse_recommendations": [1000, 10000, 50000],
+    "overall_values": [1000, 10000, 50000],
+    "permission_insights": [500, 5000, 20000],
+    "iam_aggregation": [500, 5000, 20000],
+    "asset_page_decode": [100, 1000],
+    "role_page_decode": [100, 1000],
+}
+
+
+def _setup_plugin():
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    from spaceone.core import config
+
+    config.set_default_conf()
+    config.init_conf(package="cloudforet")
+
+
+class SyntheticData(object):
+    """Cached generators of the API payloads each stage consumes"""
+
+    def __init__(self, seed: int = 0):
+        self.data = ReplayData(
+            Scenario(roles=1500, permissions=12000, permissions_per_role=40, seed=seed)
+        )
+        self.project_id = self.data.scenario.project_id
+        self._cache = {}
+
+    def _cached(self, key, make):
+        if key not in self._cache:
+            self._cache[key] = make()
+        return self._cache[key]
+
+    def assets(self, size: int) -> list:
+        return self._cached(
+            ("assets", size), lambda: [self.data.asset(index, slim=True) for index in range(size)]
+        )
+
+    def recommendation_parent(self) -> str:
+        return (
+            f"projects/{self.project_id}/locations/us-central1-a/recommenders/"
+            "google.compute.instance.MachineTypeRecommender"
+        )
+
+    def recommendations(self, size: int) -> list:
+        parent = self.recommendation_parent()
+        return self._cached(
+            ("recommendations", size),
+            lambda: [self.data.recommendation(parent, index) for index in range(size)],
+        )
+
+    def iam_recommendations(self, members: int) -> list:
+        parent = f"projects/{self.project_id}/locations/global/recommenders/google.iam.policy.Recommender"
+        return self._cached(
+            ("iam_recommendations", members),
+            lambda: [self.data.iam_recommendation(parent, index) for index in range(members)],
+        )
+
+    def policy_insights(self, members: int) -> list:
+        parent = f"projects/{self.project_id}/locations/global/insightTypes/google.iam.policy.Insight"
+        return self._cached(
+            ("policy_insights", members),
+            lambda: [self.data.policy_insight(parent, index) for index in range(members)],
+        )
+
+    def service_account_insights(self, members: int) -> list:
+        parent = f"projects/{self.project_id}/locations/global/insightTypes/google.iam.serviceAccount.Insight"
+        return self._cached(
+            ("service_account_insights", members),
+            lambda: [
+                self.data.service_account_insight(parent, index)
+                for index in range(0, members, 3)
+            ],
+        )
+
+    def page_content(self, items_key: str, size: int) -> bytes:
+        """Serialized list page as it comes over the wire"""
+
+        def make():
+            if items_key == "assets":
+                items = [self.data.asset(index, slim=False) for index in range(size)]
+            else:
+                role_names = self.data.role_names
+                items = [
+                    self.data.role(role_names[index % len(role_names)])
+                    for index in range(size)
+                ]
+            return json.dumps({items_key: items, "nextPageToken": str(size)}).encode(
+                "utf-8"
+            )
+
+        return self._cached(("page", items_key, size), make)
+
+    def roles_to_permission_ids(self) -> dict:
+        from cloudforet.plugin.utils.permission_index import PermissionIndex
+
+        return self._cached(
+            "roles",
+            lambda: {
+                role_name: PermissionIndex.intern_all(permissions)
+                for role_name, permissions in self.data.roles.items()
+            },
+        )
+
+
+class StubIAMConnector(object):
+    roles_to_permission_ids = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def get_all_roles_to_permission_ids_dict(self, project_id, organization_id) -> dict:
+        return self.roles_to_permission_ids
+
+
+class StubInsightConnector(object):
+    insights = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def list_insights(self, insight_parent, **query):
+        return self.insights[insight_parent.rsplit("/", 1)[-1]]
+
+
+class StubRecommendationConnector(object):
+    recommendations = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def list_recommendations(self, recommendation_parent, **query):
+        if recommendation_parent.startswith("projects/"):
+            return self.recommendations
+        return []
+
+
+class Stages(object):
+    """Each stage returns a zero-argument callable that runs the measured code once"""
+
+    def __init__(self, synthetic: SyntheticData):
+        from cloudforet.plugin.manager.recommender.all_recommendations_manager import (
+            AllRecommendationsManager,
+        )
+        from cloudforet.plugin.utils.converter import Converter
+
+        self.synthetic = synthetic
+        self.manager_class = AllRecommendationsManager
+        self.converter = Converter()
+
+    def _all_recommendations_manager(self):
+        from cloudforet.plugin.config.global_conf import RECOMMENDATION_MAP
+
+        manager = self.manager_class()
+        manager.project_id = self.synthetic.project_id
+        manager.converter = self.converter
+        manager.recommender_map = copy.deepcopy(RECOMMENDATION_MAP)
+        return manager
+
+    def cloud_asset_locations(self, size: int):
+        manager = self._all_recommendations_manager()
+        assets = self.synthetic.assets(size)
+        return lambda: manager._create_parents_and_location_map_by_cloud_asset_api(assets)
+
+    def recommender_locations(self, size: int):
+        manager = self._all_recommendations_manager()
+        parents_and_locations_map = (
+            manager._create_parents_and_location_map_by_cloud_asset_api(
+                self.synthetic.assets(size)
+            )
+        )
+        manager._add_group_and_service_to_recommender_map()
+        recommender_map = manager.recommender_map
+
+        def run():
+            # Both arguments are updated in place, so each run gets fresh copies
+            manager.recommender_map = copy.deepcopy(recommender_map)
+            manager._add_locations_to_recommender_map(
+                copy.deepcopy(parents_and_locations_map)
+            )
+
+        return run
+
+    def parse_recommendations(self, size: int):
+        manager = self._all_recommendations_manager()
+        parent = self.synthetic.recommendation_parent()
+        recommendations = self.synthetic.recommendations(size)
+        return lambda: manager._parse_recommendations(parent, recommendations)
+
+    def overall_values(self, size: int):
+        manager = self._all_recommendations_manager()
+        rec_infos = manager._parse_recommendations(
+            self.synthetic.recommendation_parent(), self.synthetic.recommendations(size)
+        )
+        return lambda: manager._get_overall_values(rec_infos)
+
+    def _iam_manager(self):
+        from cloudforet.plugin.manager.recommender.iam_management_manager import (
+            IAMManagementRecommendationManager,
+        )
+
+        manager = IAMManagementRecommendationManager()
+        manager.project_id = self.synthetic.project_id
+        manager.converter = self.converter
+        manager.all_roles_to_permission_ids = self.synthetic.roles_to_permission_ids()
+        return manager
+
+    def permission_insights(self, size: int):
+        manager = self._iam_manager()
+        insights = self.synthetic.policy_insights(size)
+        return lambda: [
+            manager._parse_permission_usage_insights(insight) for insight in insights
+        ]
+
+    def iam_aggregation(self, size: int):
+        from cloudforet.plugin.manager.recommender import iam_management_manager
+
+        manager = self._iam_manager()
+        stub_iam = type("StubIAMConnector", (StubIAMConnector,), {})
+        stub_iam.roles_to_permission_ids = self.synthetic.roles_to_permission_ids()
+        stub_insight = type("StubInsightConnector", (StubInsightConnector,), {})
+        stub_insight.insights = {
+            "google.iam.policy.Insight": self.synthetic.policy_insights(size),
+            "google.iam.serviceAccount.Insight": self.synthetic.service_account_insights(size),
+        }
+        stub_recommendation = type(
+            "StubRecommendationConnector", (StubRecommendationConnector,), {}
+        )
+        stub_recommendation.recommendations = self.synthetic.iam_recommendations(size)
+        secret_data = {
+            "project_id": self.synthetic.project_id,
+            "organization_id": "bench-org",
+        }
+
+        def run():
+            with mock.patch.multiple(
+                iam_management_manager,
+                IAMConnector=stub_iam,
+                InsightConnector=stub_insight,
+                RecommendationConnector=stub_recommendation,
+            ), mock.patch.object(
+                manager, "make_cloud_service_response", side_effect=lambda **kwargs: kwargs
+            ):
+                return sum(1 for _ in manager.create_cloud_service({}, secret_data, None))
+
+        return run
+
+    def _decode(self, items_key: str, size: int):
+        from cloudforet.plugin.connector.base import GoogleCloudConnector
+
+        model = GoogleCloudConnector.model_class()
+        content = self.synthetic.page_content(items_key, size)
+        return lambda: model.deserialize(content)
+
+    def asset_page_decode(self, size: int):
+        return self._decode("assets", size)
+
+    def role_page_decode(self, size: int):
+        return self._decode("roles", size)
+
+
+def measure(func, repeat: int) -> dict:
+    func()  # warm up
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+    return {"min": min(timings), "median": statistics.median(timings), "repeat": repeat}
+
+
+def run_benchmarks(stage_names: list, sizes: dict, repeat: int, seed: int) -> dict:
+    stages = Stages(SyntheticData(seed))
+    results = {}
+    for stage_name in stage_names:
+        results[stage_name] = {}
+        for size in sizes[stage_name]:
+            result = measure(getattr(stages, stage_name)(size), repeat)
+            results[stage_name][str(size)] = result
+            print(
+                f"{stage_name:<24}{size:>9}  min {result['min'] * 1000:10.2f} ms"
+                f"  median {result['median'] * 1000:10.2f} ms",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Prints the median ratio to the baseline and returns the regressed stages"""
+    regressions = []
+    for stage_name, stage_results in results.items():
+        for size, result in stage_results.items():
+            base = baseline.get(stage_name, {}).get(size)
+            if not base:
+                continue
+            ratio = result["median"] / base["median"]
+            marker = ""
+            if ratio > 1 + max_regression:
+                marker = "  REGRESSION"
+                regressions.append(f"{stage_name}[{size}]")
+            print(f"{stage_name:<24}{size:>9}  {ratio:6.2f}x baseline{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGE_SIZES), default=list(STAGE_SIZES))
+    parser.add_argument("--sizes", nargs="+", type=int, help="override the sizes of every stage")
+    parser.add_argument("--quick", action="store_true", help="run the smallest size only")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="exit with an error when a median is slower than the baseline by this ratio",
+    )
+    args = parser.parse_args()
+
+    sizes = {
+        stage_name: args.sizes or (stage_sizes[:1] if args.quick else stage_sizes)
+        for stage_name, stage_sizes in STAGE_SIZES.items()
+    }
+
+    _setup_plugin()
+    results = run_benchmarks(args.stages, sizes, args.repeat, args.seed)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(
+                {"python": platform.python_version(), "results": results}, f, indent=2
+            )
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""
+Offline stand-in for the Google APIs used by the collector.
+
+Serves discovery documents, an OAuth token endpoint, the recommender docs page
+and synthetic Cloud Asset, Recommender (recommendations/insights) and IAM
+responses, including batch requests. Page sizes, latency and 403/429 injection
+are configurable, and request counters are exposed on /_stats. Recommendation
+`filter` expressions (field = value, OR, AND) and `fields` partial response
+masks are applied like the real APIs do. Responses are gzip-compressed when
+the client accepts it, and /_stats counts the opened connections.
+
+    python -m benchmark.replay_server --port 8080 --assets 200000
+"""
+import argparse
+import email.parser
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ASSET_TYPES = [
+    "compute.googleapis.com/Instance",
+    "compute.googleapis.com/Disk",
+    "compute.googleapis.com/Address",
+    "compute.googleapis.com/Image",
+    "compute.googleapis.com/InstanceGroupManager",
+    "compute.googleapis.com/Commitment",
+    "sqladmin.googleapis.com/Instance",
+    "bigquery.googleapis.com/Dataset",
+    "bigquery.googleapis.com/Table",
+    "run.googleapis.com/Service",
+    "container.googleapis.com/Cluster",
+    "storage.googleapis.com/Bucket",
+    "pubsub.googleapis.com/Topic",
+    "iam.googleapis.com/ServiceAccount",
+    "logging.googleapis.com/LogBucket",
+]
+IAM_RECOMMENDER_ID = "google.iam.policy.Recommender"
+PRIORITIES = ["P1", "P2", "P3", "P4"]
+STATES = ["ACTIVE", "ACTIVE", "ACTIVE", "CLAIMED", "SUCCEEDED", "DISMISSED"]
+CATEGORIES = {
+    "Cost": "COST",
+    "Security": "SECURITY",
+    "Performance": "PERFORMANCE",
+    "Reliability": "RELIABILITY",
+    "Manageability": "MANAGEABILITY",
+    "Sustainability": "SUSTAINABILITY",
+}
+
+
+class Scenario(object):
+    def __init__(
+        self,
+        project_id: str = "bench-project",
+        organization_id: str = "bench-org",
+        assets: int = 20000,
+        recommendations: int = 2000,
+        iam_members: int = 500,
+        roles: int = 1500,
+        permissions: int = 12000,
+        permissions_per_role: int = 40,
+        alive_ratio: float = 0.3,
+        max_page_size: int = 100,
+        latency: float = 0.0,
+        forbidden_ratio: float = 0.0,
+        throttle_ratio: float = 0.0,
+        seed: int = 0,
+    ):
+        self.project_id = project_id
+        self.organization_id = organization_id
+        self.assets = assets
+        self.recommendations = recommendations
+        self.iam_members = iam_members
+        self.roles = roles
+        self.permissions = permissions
+        self.permissions_per_role = permissions_per_role
+        self.alive_ratio = alive_ratio
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.forbidden_ratio = forbidden_ratio
+        self.throttle_ratio = throttle_ratio
+        self.seed = seed
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser):
+        defaults = cls()
+        for name, value in vars(defaults).items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=type(value), default=value
+            )
+
+    @classmethod
+    def from_arguments(cls, args: argparse.Namespace):
+        return cls(**{name: getattr(args, name) for name in vars(cls())})
+
+
+def _ratio(*keys) -> float:
+    digest = hashlib.md5(":".join(str(key) for key in keys).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class ReplayData(object):
+    """Deterministic synthetic data, generated per page instead of held in memory"""
+
+    def __init__(self, scenario: Scenario):
+        # Imported here so that importing this module does not freeze the
+        # environment driven plugin settings before a benchmark sets them.
+        from cloudforet.plugin.config.global_conf import RECOMMENDATION_MAP, REGION_INFO
+
+        self.scenario = scenario
+        self.recommendation_map = RECOMMENDATION_MAP
+        self.regions = [region for region in REGION_INFO if region != "global"]
+        self.zones = [f"{region}-{zone}" for region in self.regions for zone in "abc"]
+        self.locations = self.zones + self.regions + ["global"]
+        self.permission_names = [
+            f"service{index % 200}.resource{index // 200}.{verb}"
+            for index, verb in zip(
+                range(scenario.permissions),
+                ["get", "list", "create", "update", "delete", "use"] * scenario.permissions,
+            )
+        ]
+        self.roles = self._make_roles()
+        self.role_names = list(self.roles)
+        self.rec_counts = self._make_recommendation_counts()
+
+    def _make_roles(self) -> dict:
+        rnd = random.Random(self.scenario.seed)
+        roles = {
+            "roles/owner": self.permission_names[: self.scenario.permissions // 2],
+            "roles/editor": self.permission_names[: self.scenario.permissions // 3],
+            "roles/viewer": [name for name in self.permission_names if name.endswith((".get", ".list"))],
+        }
+        for index in range(max(0, self.scenario.roles - len(roles))):
+            roles[f"roles/service{index % 200}.role{index}"] = rnd.sample(
+                self.permission_names,
+                min(self.scenario.permissions_per_role, len(self.permission_names)),
+            )
+        return roles
+
+    def _make_recommendation_counts(self) -> dict:
+        alive = [
+            f"projects/{self.scenario.project_id}/locations/{location}/recommenders/{recommender_id}"
+            for recommender_id in self.recommendation_map
+            if recommender_id != IAM_RECOMMENDER_ID
+            for location in self.locations
+            if _ratio(self.scenario.seed, recommender_id, location) < self.scenario.alive_ratio
+        ]
+        counts = {}
+        if alive:
+            quotient, remainder = divmod(self.scenario.recommendations, len(alive))
+            for index, parent in enumerate(alive):
+                if quotient + (index < remainder):
+                    counts[parent] = quotient + (index < remainder)
+        return counts
+
+    # Cloud Asset
+    def asset(self, index: int, slim: bool) -> dict:
+        asset_type = ASSET_TYPES[index % len(ASSET_TYPES)]
+        location = self.locations[(index // len(ASSET_TYPES)) % len(self.locations)]
+        if slim:
+            return {"assetType": asset_type, "resource": {"location": location}}
+        name = f"//{asset_type.split('/')[0]}/projects/{self.scenario.project_id}/resource-{index}"
+        return {
+            "name": name,
+            "assetType": asset_type,
+            "resource": {
+                "version": "v1",
+                "discoveryDocumentUri": f"https://{asset_type.split('/')[0]}/$discovery/rest",
+                "discoveryName": asset_type.split("/")[1],
+                "parent": f"//cloudresourcemanager.googleapis.com/projects/{self.scenario.project_id}",
+                "location": location,
+                "data": {
+                    "id": str(10 ** 15 + index),
+                    "name": f"resource-{index}",
+                    "selfLink": f"https:{name}",
+                    "creationTimestamp": "2024-01-01T00:00:00.000-07:00",
+                    "labels": {f"label{key}": f"value{key}" for key in range(8)},
+                    "status": "READY",
+                    "description": "synthetic resource " * 8,
+                },
+            },
+            "ancestors": [f"projects/{index}", f"organizations/{self.scenario.organization_id}"],
+            "updateTime": "2024-01-01T00:00:00Z",
+        }
+
+    def asset_indices(self, asset_types: list) -> list:
+        if not asset_types:
+            return range(self.scenario.assets)
+        patterns = [re.compile(asset_type) for asset_type in asset_types]
+        matched = [
+            index
+            for index, asset_type in enumerate(ASSET_TYPES)
+            if any(pattern.fullmatch(asset_type) for pattern in patterns)
+        ]
+        return [
+            index
+            for index in range(self.scenario.assets)
+            if index % len(ASSET_TYPES) in matched
+        ]
+
+    # IAM
+    def role(self, role_name: str) -> dict:
+        """Role in the FULL view, custom roles get the first permissions"""
+        permissions = self.roles.get(role_name) or self.permission_names[:20]
+        return {
+            "name": role_name,
+            "title": role_name.rsplit("/", 1)[-1],
+            "description": f"Synthetic role {role_name}",
+            "includedPermissions": permissions,
+            "stage": "GA",
+            "etag": "AA==",
+        }
+
+    # Recommender
+    def recommendation(self, parent: str, index: int) -> dict:
+        recommender_id = parent.rsplit("/", 1)[-1]
+        category = CATEGORIES.get(
+            self.recommendation_map.get(recommender_id, {}).get("category"), "COST"
+        )
+        location = parent.split("/locations/")[1].split("/")[0]
+        resource = f"//compute.googleapis.com/projects/{self.scenario.project_id}/zones/{location}/instances/vm-{index}"
+        return {
+            "name": f"{parent}/recommendations/{hashlib.md5(f'{parent}{index}'.encode()).hexdigest()}",
+            "description": f"Synthetic recommendation {index} of {recommender_id}",
+            "recommenderSubtype": "STOP_VM",
+            "lastRefreshTime": f"2024-01-{1 + index % 28:02d}T00:00:00Z",
+            "primaryImpact": {
+                "category": category,
+                "costProjection": {
+                    "cost": {"currencyCode": "USD", "units": f"-{index % 300}", "nanos": -500000000},
+                    "duration": "2592000s",
+                },
+            },
+            "content": {
+                "operationGroups": [
+                    {
+                        "operations": [
+                            {
+                                "action": "test",
+                                "resourceType": "compute.googleapis.com/Instance",
+                                "resource": resource,
+                                "path": "/status",
+                                "value": "RUNNING",
+                            },
+                            {
+                                "action": "replace",
+                                "resourceType": "compute.googleapis.com/Instance",
+                                "resource": resource,
+                                "path": "/status",
+                                "value": "TERMINATED",
+                            },
+                        ]
+                    }
+                ],
+                "overview": {"resourceName": resource},
+            },
+            "stateInfo": {"state": STATES[index % len(STATES)]},
+            "etag": f'"{index:016x}"',
+            "associatedInsights": [{"insight": f"{parent}/insights/{index}"}],
+            "priority": PRIORITIES[index % len(PRIORITIES)],
+        }
+
+    def iam_member(self, index: int) -> str:
+        if index % 3 == 0:
+            return f"serviceAccount:sa-{index}@{self.scenario.project_id}.iam.gserviceaccount.com"
+        return f"user:member-{index}@example.com"
+
+    def iam_role(self, index: int) -> str:
+        return self.role_names[index % min(len(self.role_names), 50)]
+
+    def iam_recommendation(self, parent: str, index: int) -> dict:
+        role = self.iam_role(index)
+        return {
+            "name": f"{parent}/recommendations/iam-{index}",
+            "description": "Replace the current role with a smaller role",
+            "recommenderSubtype": "REMOVE_ROLE",
+            "lastRefreshTime": "2024-01-01T00:00:00Z",
+            "primaryImpact": {
+                "category": "SECURITY",
+                "securityProjection": {
+                    "details": {"revokedIamPermissionsCount": len(self.roles[role]) // 2}
+                },
+            },
+            "content": {
+                "overview": {
+                    "member": self.iam_member(index),
+                    "removedRole": role,
+                    "resource": f"//cloudresourcemanager.googleapis.com/projects/{self.scenario.project_id}",
+                },
+                "operationGroups": [
+                    {"operations": [{"action": "remove", "resource": f"projects/{self.scenario.project_id}"}]}
+                ],
+            },
+            "stateInfo": {"state": "ACTIVE"},
+            "associatedInsights": [{"insight": f"iam-insight-{index}"}],
+            "priority": PRIORITIES[index % len(PRIORITIES)],
+        }
+
+    def policy_insight(self, parent: str, index: int) -> dict:
+        role = self.iam_role(index)
+        permissions = self.roles[role]
+        return {
+            "name": f"{parent}/insights/iam-insight-{index}",
+            "observationPeriod": "7776000s",
+            "lastRefreshTime": "2024-01-01T00:00:00Z",
+            "content": {
+                "member": self.iam_member(index),
+                "role": role,
+                "exercisedPermissions": [
+                    {"permission": permission} for permission in permissions[: len(permissions) // 10]
+                ],
+                "inferredPermissions": [
+                    {"permission": permission} for permission in permissions[-3:]
+                ],
+                "currentTotalPermissionsCount": str(len(permissions)),
+            },
+        }
+
+    def service_account_insight(self, parent: str, index: int) -> dict:
+        return {
+            "name": f"{parent}/insights/sa-insight-{index}",
+            "observationPeriod": "7776000s",
+            "lastRefreshTime": "2024-01-01T00:00:00Z",
+            "content": {
+                "email": self.iam_member(index).split(":")[1],
+                "lastAuthenticatedTime": "2023-10-01T00:00:00Z",
+            },
+        }
+
+
+class ReplayState(object):
+    def __init__(self, scenario: Scenario):
+        self.scenario = scenario
+        self.data = ReplayData(scenario)
+        self.random = random.Random(scenario.seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {
+                "calls": {},
+                "statuses": {},
+                "bytes_sent": 0,
+                "batches": 0,
+                "connections": 0,
+            }
+
+    def count_connection(self):
+        with self._lock:
+            self.stats["connections"] += 1
+
+    def count(self, service: str, status: int, size: int):
+        with self._lock:
+            self.stats["calls"][service] = self.stats["calls"].get(service, 0) + 1
+            self.stats["statuses"][str(status)] = self.stats["statuses"].get(str(status), 0) + 1
+            self.stats["bytes_sent"] += size
+
+    def should_throttle(self) -> bool:
+        if not self.scenario.throttle_ratio:
+            return False
+        with self._lock:
+            return self.random.random() < self.scenario.throttle_ratio
+
+
+def _error(status: int, grpc_status: str, message: str) -> tuple:
+    body = {"error": {"code": status, "message": message, "status": grpc_status}}
+    return status, {}, body
+
+
+def parse_fields(text: str, position: int = 0) -> tuple:
+    """
+    Parses a partial response mask ("a,b/c,d(e,f/g)") into a tree of
+    {name: subtree}, where None selects the whole value. Returns (tree, end).
+    """
+    tree = {}
+    while position < len(text) and text[position] != ")":
+        node, name = tree, None
+        while True:
+            end = position
+            while end < len(text) and text[end] not in ",/()":
+                end += 1
+            name, position = text[position:end].strip(), end
+            if position < len(text) and text[position] == "/":
+                if node.get(name, {}) is None:
+                    node = {}  # already selected as a whole
+                else:
+                    node = node.setdefault(name, {})
+                position += 1
+                continue
+            break
+
+        if position < len(text) and text[position] == "(":
+            subtree, position = parse_fields(text, position + 1)
+            position += 1  # ")"
+            if node.get(name, {}) is not None:
+                node.setdefault(name, {}).update(subtree)
+        else:
+            node[name] = None
+        if position < len(text) and text[position] == ",":
+            position += 1
+    return tree, position
+
+
+def apply_fields(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {
+            name: apply_fields(value[name], subtree)
+            for name, subtree in tree.items()
+            if name in value
+        }
+    return value
+
+
+def _get_path(item: dict, path: str):
+    for name in path.split("."):
+        item = item.get(name) if isinstance(item, dict) else None
+    return item
+
+
+def match_filter(item: dict, expression: str) -> bool:
+    """Evaluates `field = value` terms joined by OR inside AND-ed groups"""
+    for group in re.split(r"\s+AND\s+", expression.strip()):
+        terms = re.split(r"\s+OR\s+", group.strip().strip("()"))
+        if not any(
+            str(_get_path(item, field.strip())) == value.strip()
+            for field, _, value in (term.partition("=") for term in terms)
+        ):
+            return False
+    return True
+
+
+class ReplayRouter(object):
+    def __init__(self, state: ReplayState):
+        self.state = state
+        self.data = state.data
+        self.scenario = state.scenario
+
+    def handle(self, method: str, path: str, query: dict) -> tuple:
+        """Returns (status, headers, body) where body is a dict or str"""
+        status, headers, body = self._route(method, path, query)
+        if status == 200 and isinstance(body, dict) and "fields" in query:
+            body = apply_fields(body, parse_fields(query["fields"][0])[0])
+        return status, headers, body
+
+    def _route(self, method: str, path: str, query: dict) -> tuple:
+        if path == "/token":
+            return 200, {}, {"access_token": "replay-token", "expires_in": 3600, "token_type": "Bearer"}
+        if path == "/docs/recommenders":
+            return 200, {"ETag": '"replay-catalog"'}, self._docs_page()
+        if path.startswith("/discovery/"):
+            return self._discovery(path)
+
+        if self.state.should_throttle():
+            status, headers, body = _error(429, "RESOURCE_EXHAUSTED", "Quota exceeded (replay)")
+            headers["Retry-After"] = "0"
+            return status, headers, body
+
+        if path.startswith("/cloudasset/v1/"):
+            return self._assets(query)
+        if path.startswith("/recommender/v1beta1/"):
+            return self._recommender(path[len("/recommender/v1beta1/"):], query)
+        if path.startswith("/iam/v1/"):
+            return self._roles(path[len("/iam/v1/"):], query)
+        return _error(404, "NOT_FOUND", f"{method} {path} is not replayed")
+
+    def _page(self, total: int, query: dict) -> tuple:
+        page_size = int(query.get("pageSize", [self.scenario.max_page_size])[0])
+        page_size = max(1, min(page_size, self.scenario.max_page_size))
+        start = int(query.get("pageToken", ["0"])[0])
+        end = min(total, start + page_size)
+        next_token = str(end) if end < total else None
+        return start, end, next_token
+
+    @staticmethod
+    def _with_token(body: dict, next_token: str) -> dict:
+        if next_token:
+            body["nextPageToken"] = next_token
+        return body
+
+    def _assets(self, query: dict) -> tuple:
+        slim = "fields" in query
+        indices = self.data.asset_indices(query.get("assetTypes", []))
+        start, end, next_token = self._page(len(indices), query)
+        assets = [self.data.asset(indices[position], slim) for position in range(start, end)]
+        return 200, {}, self._with_token({"assets": assets}, next_token)
+
+    def _recommender(self, path: str, query: dict) -> tuple:
+        parent, _, kind = path.rpartition("/")
+        if _ratio(self.scenario.seed, "forbidden", parent) < self.scenario.forbidden_ratio:
+            return _error(403, "PERMISSION_DENIED", f"Permission denied on {parent}")
+
+        if kind == "recommendations":
+            if parent.endswith(IAM_RECOMMENDER_ID):
+                total = self.scenario.iam_members if parent.startswith("projects/") else 0
+                make = self.data.iam_recommendation
+            else:
+                total = self.data.rec_counts.get(parent, 0)
+                make = self.data.recommendation
+            if "filter" in query:
+                items = [make(parent, index) for index in range(total)]
+                items = [item for item in items if match_filter(item, query["filter"][0])]
+                start, end, next_token = self._page(len(items), query)
+                items = items[start:end]
+            else:
+                start, end, next_token = self._page(total, query)
+                items = [make(parent, index) for index in range(start, end)]
+            return 200, {}, self._with_token({"recommendations": items}, next_token)
+
+        if kind == "insights":
+            if parent.endswith("google.iam.policy.Insight"):
+                total, make = self.scenario.iam_members, self.data.policy_insight
+                indices = range(total)
+            else:
+                indices = range(0, self.scenario.iam_members, 3)
+                total, make = len(indices), self.data.service_account_insight
+            start, end, next_token = self._page(total, query)
+            items = [make(parent, indices[position]) for position in range(start, end)]
+            return 200, {}, self._with_token({"insights": items}, next_token)
+        return _error(404, "NOT_FOUND", f"{path} is not replayed")
+
+    def _roles(self, path: str, query: dict) -> tuple:
+        if path == "roles":
+            role_names = self.data.role_names
+        else:
+            # A handful of custom roles per project/organization
+            role_names = [f"{path}/custom{index}" for index in range(5)]
+        start, end, next_token = self._page(len(role_names), query)
+        roles = [self.data.role(role_name) for role_name in role_names[start:end]]
+        return 200, {}, self._with_token({"roles": roles}, next_token)
+
+    def _docs_page(self) -> str:
+        rows = "".join(
+            f"<tr><td>{info['category']}</td><td>{info['name']}</td><td>{recommender_id}</td>"
+            f"<td>{info['shortDescription']}</td><td>-</td></tr>"
+            for recommender_id, info in self.data.recommendation_map.items()
+        )
+        return f"<html><body><table><tr><th>Category</th></tr>{rows}</table></body></html>"
+
+    @staticmethod
+    def _discovery(path: str) -> tuple:
+        from googleapiclient import discovery_cache
+
+        _, _, service, version = path.split("/", 3)
+        document = discovery_cache.get_static_doc(service, version)
+        if document is None:
+            return _error(404, "NOT_FOUND", f"no discovery document for {service} {version}")
+        return 200, {}, json.loads(document)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    router = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.router.state.count_connection()
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parsed = urllib.parse.urlparse(self.path)
+        service = parsed.path.strip("/").split("/", 1)[0]
+
+        if service == "_stats":
+            return self._send(200, {}, self.router.state.stats)
+        if service == "_reset":
+            self.router.state.reset()
+            return self._send(200, {}, {})
+
+        if self.router.scenario.latency:
+            time.sleep(self.router.scenario.latency)
+
+        if parsed.path.endswith("/batch"):
+            status, headers, payload = self._batch(body)
+        else:
+            status, headers, payload = self.router.handle(
+                self.command, parsed.path, urllib.parse.parse_qs(parsed.query)
+            )
+        size = self._send(status, headers, payload)
+        self.router.state.count(service, status, size)
+
+    def _batch(self, body: bytes) -> tuple:
+        content_type = self.headers.get("Content-Type")
+        message = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+        )
+        boundary = "replay_batch_boundary"
+        parts = []
+        for part in message.get_payload():
+            request_line = part.get_payload().split("\r\n", 1)[0]
+            method, uri, _ = request_line.split(" ", 2)
+            parsed = urllib.parse.urlparse(uri)
+            status, headers, payload = self.router.handle(
+                method, parsed.path, urllib.parse.parse_qs(parsed.query)
+            )
+            content_id = part["Content-ID"][1:-1]
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}\r\n"
+                f"Content-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        self.router.state.stats["batches"] += 1
+        body = "".join(parts) + f"--{boundary}--"
+        return 200, {"Content-Type": f'multipart/mixed; boundary="{boundary}"'}, body
+
+    def _send(self, status: int, headers: dict, payload) -> int:
+        if isinstance(payload, (dict, list)):
+            content = json.dumps(payload).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json; charset=UTF-8")
+        else:
+            content = payload.encode("utf-8")
+            headers.setdefault("Content-Type", "text/html; charset=UTF-8")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            content = gzip.compress(content, compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        return len(content)
+
+
+def make_server(scenario: Scenario, host: str = "127.0.0.1", port: int = 0):
+    handler = type("BoundReplayHandler", (ReplayHandler,), {})
+    handler.router = ReplayRouter(ReplayState(scenario))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    Scenario.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(Scenario.from_arguments(args), args.host, args.port)
+    host, port = server.server_address
+    print(f"Replay server on http://{host}:{port} (GOOGLE_API_ROOT_URL=http://{host}:{port}/{{service}}/)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
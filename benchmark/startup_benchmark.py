@@ -0,0 +1,103 @@
+"""
+Cold-start benchmark of the plugin server.
+
+Every run is a fresh interpreter that configures the plugin, imports
+cloudforet.plugin.main and serves one Collector.init. Reports the median import
+time, time to the first Collector.init response and which heavy dependencies
+were already loaded by then (they should be imported at the first collect).
+
+    python -m benchmark.startup_benchmark --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+HEAVY_MODULES = [
+    "googleapiclient.discovery",
+    "google.oauth2.service_account",
+    "bs4",
+    "orjson",
+    "cloudforet.plugin.connector",
+    "cloudforet.plugin.manager.recommender.all_recommendations_manager",
+    "cloudforet.plugin.manager.recommender.iam_management_manager",
+]
+
+
+def run_child() -> dict:
+    started_at = time.perf_counter()
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    from spaceone.core import config
+
+    config.set_default_conf()
+    config.init_conf(package="cloudforet")
+    configured_at = time.perf_counter()
+
+    import cloudforet.plugin.main  # noqa: F401 registers the plugin methods
+
+    imported_at = time.perf_counter()
+
+    from spaceone.inventory.plugin.collector.service.collector_service import (
+        CollectorService,
+    )
+
+    CollectorService.get_plugin_method("init")({"options": {}})
+    initialized_at = time.perf_counter()
+
+    return {
+        "config_time": configured_at - started_at,
+        "import_time": imported_at - configured_at,
+        "init_time": initialized_at - imported_at,
+        "time_to_first_init": initialized_at - started_at,
+        "loaded_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmark.startup_benchmark", "--child"],
+        cwd=os.path.dirname(SRC_DIR),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child()))
+        return
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {
+        "runs": runs,
+        "median": {
+            key: statistics.median(run[key] for run in runs)
+            for key in ("config_time", "import_time", "init_time", "time_to_first_init")
+        },
+        "loaded_modules": sorted({name for run in runs for name in run["loaded_modules"]}),
+    }
+
+    dumped = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(dumped)
+    print(dumped)
+
+
+if __name__ == "__main__":
+    main()
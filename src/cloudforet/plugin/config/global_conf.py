@@ -1,7 +1,149 @@
+import os
+import tempfile
+
 # ICON URL
 ASSET_URL = "https://spaceone-custom-assets.s3.ap-northeast-2.amazonaws.com/console-assets/icons/cloud-services/google_cloud"
 
-RECOMMENDATION_TYPE_DOCS_URL = "https://cloud.google.com/recommender/docs/recommenders"
+RECOMMENDATION_TYPE_DOCS_URL = os.environ.get(
+    "RECOMMENDATION_TYPE_DOCS_URL",
+    "https://cloud.google.com/recommender/docs/recommenders",
+)
+
+# Root URL of the Google APIs, e.g. "http://127.0.0.1:8080/{service}/" for an
+# offline replay server. "{service}" is replaced by the API name.
+GOOGLE_API_ROOT_URL = os.environ.get("GOOGLE_API_ROOT_URL")
+
+# Local cache of crawled/collected data shared by collects in the same pod
+CACHE_DIR = os.environ.get(
+    "RECOMMENDER_COLLECTOR_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "plugin-google-recommender-inven-collector"),
+)
+
+# Recommender catalog crawled from RECOMMENDATION_TYPE_DOCS_URL
+RECOMMENDER_CATALOG_TTL = 24 * 60 * 60
+RECOMMENDER_CATALOG_RETRY_INTERVAL = 10 * 60
+RECOMMENDER_CATALOG_TIMEOUT = 5
+
+# In-process aggregate of the per-collect metrics summaries
+METRICS_REGISTRY_ENABLED = (
+    os.environ.get("RECOMMENDER_COLLECTOR_METRICS_REGISTRY", "false").lower() == "true"
+)
+METRICS_REGISTRY_HISTORY = 20
+
+# Tracing spans of the collect, off unless exporters are set
+# - exporters: comma separated "console", "file" (spans.jsonl), "chrome" (trace-<id>.json)
+TRACE_EXPORTERS = [
+    name.strip()
+    for name in os.environ.get("RECOMMENDER_COLLECTOR_TRACE_EXPORTERS", "").split(",")
+    if name.strip()
+]
+TRACE_DIR = os.environ.get(
+    "RECOMMENDER_COLLECTOR_TRACE_DIR", os.path.join(CACHE_DIR, "traces")
+)
+
+# Number of recommender parents listed in parallel
+DEFAULT_RECOMMENDER_CONCURRENCY = 8
+
+# Responses buffered between the manager workers and the collect stream
+COLLECT_QUEUE_SIZE = 100
+
+# Client side quota of the Google APIs, shared by every connector in the process
+# - rate/burst: token bucket (requests per second)
+# - min/max_concurrency: bounds of the adaptive (AIMD) concurrency limit
+API_RATE_LIMITS = {
+    "recommender": {"rate": 50, "burst": 50, "min_concurrency": 1, "max_concurrency": 32},
+    "cloudasset": {"rate": 5, "burst": 10, "min_concurrency": 1, "max_concurrency": 4},
+    "iam": {"rate": 20, "burst": 20, "min_concurrency": 1, "max_concurrency": 8},
+}
+DEFAULT_API_RATE_LIMIT = {"rate": 10, "burst": 10, "min_concurrency": 1, "max_concurrency": 8}
+
+# Retries of throttled (429, quota 403) and unavailable (5xx) API calls
+API_MAX_RETRIES = 5
+API_RETRY_BASE_DELAY = 1
+API_RETRY_MAX_DELAY = 32
+
+# Requests sent in one batch HTTP request when options.batch_requests is set
+BATCH_REQUEST_SIZE = 100
+
+# HTTP transport of the Google API clients
+# - "pooled": one keep-alive connection pool (requests/urllib3) shared by every
+#   connector and thread, with at most HTTP_POOL_MAXSIZE connections per host
+# - "httplib2": an httplib2.Http per thread
+HTTP_TRANSPORT = os.environ.get("RECOMMENDER_COLLECTOR_HTTP_TRANSPORT", "pooled")
+HTTP_POOL_HOSTS = 10
+HTTP_POOL_MAXSIZE = 32
+HTTP_TIMEOUT = 60
+
+# Decoder of the API response bodies: "auto" (orjson when installed), "orjson" or "json"
+JSON_DECODER = os.environ.get("RECOMMENDER_COLLECTOR_JSON_DECODER", "auto")
+
+# Threads fetching the next page while the current one is consumed. Look-aheads
+# the pool has not started are fetched by the caller, so this does not cap the
+# list calls in flight.
+PAGINATOR_PREFETCH_WORKERS = 16
+
+# Page sizes of the list APIs (options.page_size overrides them)
+CLOUD_ASSET_PAGE_SIZE = 1000
+IAM_ROLE_PAGE_SIZE = 1000
+RECOMMENDATION_PAGE_SIZE = 1000
+INSIGHT_PAGE_SIZE = 1000
+
+# Negative cache of recommender parents that were forbidden or empty
+# - re-probe interval doubles on every miss, from BASE to MAX seconds
+# - SAMPLE_RATIO of the skipped parents are re-probed on every collect anyway
+NEGATIVE_CACHE_BASE_INTERVAL = 6 * 60 * 60
+NEGATIVE_CACHE_MAX_INTERVAL = 3 * 24 * 60 * 60
+NEGATIVE_CACHE_SAMPLE_RATIO = 0.05
+
+# IAM role -> permission catalog cache (seconds)
+IAM_PREDEFINED_ROLE_CACHE_TTL = 24 * 60 * 60
+IAM_CUSTOM_ROLE_CACHE_TTL = 10 * 60
+
+# Cloud Asset services whose asset types can be used to find recommender locations
+CLOUD_ASSET_SERVICES = [
+    "alloydb",
+    "apikeys",
+    "artifactregistry",
+    "bigquery",
+    "cloudfunctions",
+    "compute",
+    "container",
+    "dataflow",
+    "dataproc",
+    "file",
+    "iam",
+    "logging",
+    "pubsub",
+    "redis",
+    "run",
+    "spanner",
+    "sqladmin",
+    "storage",
+]
+
+# Partial response of the Cloud Asset scan used for location discovery
+CLOUD_ASSET_LOCATION_FIELDS = "nextPageToken,assets(assetType,resource/location)"
+
+# Partial responses of the Recommender listings, limited to the parsed fields
+RECOMMENDATION_FIELDS = (
+    "nextPageToken,recommendations(name,description,recommenderSubtype,priority,"
+    "lastRefreshTime,stateInfo/state,associatedInsights/insight,primaryImpact,"
+    "content/operationGroups/operations/resource)"
+)
+IAM_RECOMMENDATION_FIELDS = (
+    "nextPageToken,recommendations(priority,lastRefreshTime,associatedInsights/insight,"
+    "primaryImpact/securityProjection/details/revokedIamPermissionsCount,"
+    "content/overview(member,removedRole))"
+)
+IAM_INSIGHT_FIELDS = (
+    "nextPageToken,insights(name,lastRefreshTime,observationPeriod,content(member,role,"
+    "email,lastAuthenticatedTime,currentTotalPermissionsCount,"
+    "exercisedPermissions/permission,inferredPermissions/permission))"
+)
+
+# Recommendation priorities from the highest to the lowest
+RECOMMENDATION_PRIORITIES = ["P1", "P2", "P3", "P4"]
+RECOMMENDATION_STATES = ["ACTIVE", "CLAIMED", "SUCCEEDED", "FAILED", "DISMISSED"]
 
 UNAVAILABLE_RECOMMENDER_IDS = [
     "google.cloudbilling.commitment.SpendBasedCommitmentRecommender",
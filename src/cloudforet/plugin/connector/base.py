@@ -1,17 +1,36 @@
-import google.oauth2.service_account
-import googleapiclient
-import googleapiclient.discovery
 import logging
 
+from googleapiclient.errors import HttpError
 from spaceone.core.connector import BaseConnector
 
+from cloudforet.plugin.config.global_conf import BATCH_REQUEST_SIZE
+from cloudforet.plugin.connector.client_registry import ClientRegistry
+from cloudforet.plugin.connector.json_model import FastJsonModel
+from cloudforet.plugin.connector.paginator import Paginator
+from cloudforet.plugin.connector.rate_limiter import RateLimiter
+from cloudforet.plugin.utils.error_handlers import is_retryable_error
+from cloudforet.plugin.utils.instrumentation import record_metric
+from cloudforet.plugin.utils.tracing import Tracer
+
 DEFAULT_SCHEMA = "google_oauth_client_id"
 _LOGGER = logging.getLogger(__name__)
 
 
+def _get_wire_size(resp, size: int):
+    # Decoded bodies report their compressed size as -content-length, which
+    # the pooled transport sets but httplib2 drops: unknown then.
+    if "-content-encoding" not in resp:
+        return size
+    wire_size = resp.get("-content-length")
+    return int(wire_size) if wire_size is not None else None
+
+
 class GoogleCloudConnector(BaseConnector):
     google_client_service = None
     version = None
+    page_size = None
+    # Request/response model of the discovery client (JsonModel interface)
+    model_class = FastJsonModel
 
     def __init__(self, *args, **kwargs):
         """
@@ -29,18 +48,145 @@ class GoogleCloudConnector(BaseConnector):
 
         super().__init__(*args, **kwargs)
         secret_data = kwargs.get("secret_data")
+        self.options = kwargs.get("options") or {}
+        self.page_size = self.options.get("page_size") or self.page_size
         self.project_id = secret_data.get("project_id")
-        self.credentials = (
-            google.oauth2.service_account.Credentials.from_service_account_info(
-                secret_data
-            )
+        self.secret_key = ClientRegistry.hash_secret(secret_data)
+        self.credentials = ClientRegistry.get_credentials(
+            secret_data, secret_key=self.secret_key
         )
-        self.client = googleapiclient.discovery.build(
+        self.rate_limiter = RateLimiter.get(self.google_client_service)
+
+    @property
+    def client(self):
+        # Shared by every thread and collect of this process, or per thread
+        # when the transport is not thread-safe (httplib2).
+        return ClientRegistry.get_client(
             self.google_client_service,
             self.version,
-            credentials=self.credentials,
+            self.secret_key,
+            self.credentials,
+            model_class=self.model_class,
         )
 
+    def execute(self, request, http=None, **span_attributes):
+        """
+        Executes a request through the rate limiter. Within a traced collect,
+        every attempt gets a span named after the API method, with
+        `span_attributes` (parent, page, ...).
+        """
+        if hasattr(request, "postproc"):
+            self._count_responses(request)
+        return self.rate_limiter.execute(
+            self._trace(request, span_attributes), http=http
+        )
+
+    def _trace(self, request, span_attributes: dict):
+        # Requests outside a collect (verify, get_tasks) would each start a trace
+        if not Tracer.is_enabled() or Tracer.current_span() is None:
+            return request.execute
+        method = getattr(request, "methodId", None) or type(request).__name__
+
+        def _execute(*args, **kwargs):
+            with Tracer.span(
+                method, api=self.google_client_service, **span_attributes
+            ) as span:
+                try:
+                    return request.execute(*args, **kwargs)
+                except HttpError as e:
+                    span.set_attribute("status", e.resp.status)
+                    raise
+
+        return _execute
+
+    @staticmethod
+    def _count_responses(request):
+        # postproc only sees successful responses, including the parts of a batch
+        postproc = request.postproc
+
+        def _postproc(resp, content):
+            size = len(content or b"")
+            wire_size = _get_wire_size(resp, size)
+            record_metric("pages")
+            record_metric("bytes_decoded", size)
+            if wire_size is not None:
+                record_metric("bytes_received", wire_size)
+            span = Tracer.current_span()
+            if span is not None:
+                span.set_attribute("status", resp.status)
+                span.increment("response_bytes", size)
+            return postproc(resp, content)
+
+        request.postproc = _postproc
+
+    def paginate(self, collection, items_key: str, prefetch: bool = True, **query):
+        if self.page_size:
+            query.setdefault("pageSize", self.page_size)
+        paginator = Paginator(
+            collection,
+            execute=self.execute,
+            get_http=self._get_thread_http,
+            prefetch=prefetch,
+        )
+        return paginator.items(items_key, **query)
+
+    def list_in_batch(self, collection, items_key: str, parents: list, **query):
+        """
+        Sends the first page requests of many parents in batch HTTP requests and
+        follows only the parents returning a nextPageToken.
+        Yields (parent, items, exception) in parent order.
+        """
+        if self.page_size:
+            query.setdefault("pageSize", self.page_size)
+
+        for start in range(0, len(parents), BATCH_REQUEST_SIZE):
+            chunk = parents[start : start + BATCH_REQUEST_SIZE]
+            responses = {}
+
+            def _callback(request_id, response, exception):
+                responses[request_id] = (response, exception)
+
+            batch = self.client.new_batch_http_request(callback=_callback)
+            for index, parent in enumerate(chunk):
+                request = collection.list(parent=parent, **query)
+                self._count_responses(request)
+                batch.add(request, request_id=str(index))
+            self.execute(batch, batch_size=len(chunk))
+
+            for index, parent in enumerate(chunk):
+                response, exception = responses.get(str(index), (None, None))
+                try:
+                    if exception is not None:
+                        if not is_retryable_error(exception):
+                            raise exception
+                        # Throttled in the batch, retry alone through the limiter
+                        items = list(
+                            self.paginate(collection, items_key, parent=parent, **query)
+                        )
+                    else:
+                        items = list(response.get(items_key, []))
+                        if response.get("nextPageToken"):
+                            items.extend(
+                                self.paginate(
+                                    collection,
+                                    items_key,
+                                    parent=parent,
+                                    pageToken=response["nextPageToken"],
+                                    **query,
+                                )
+                            )
+                except Exception as e:
+                    yield parent, [], e
+                    continue
+                yield parent, items, None
+
+    def verify(self):
+        """Sends one cheap request to the API, raises when the secret cannot use it"""
+        raise NotImplementedError
+
+    def _get_thread_http(self):
+        return ClientRegistry.get_http(self.secret_key, self.credentials)
+
     def generate_query(self, **query):
         query.update(
             {
@@ -51,5 +197,5 @@ class GoogleCloudConnector(BaseConnector):
 
     def list_zones(self, **query):
         query = self.generate_query(**query)
-        result = self.client.zones().list(**query).execute()
+        result = self.execute(self.client.zones().list(**query))
         return result.get("items", [])
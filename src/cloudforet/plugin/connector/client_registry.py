@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import google_auth_httplib2
+from googleapiclient.model import JsonModel
+
+from cloudforet.plugin.config.global_conf import GOOGLE_API_ROOT_URL
+from cloudforet.plugin.connector.transport import HttpTransport
+
+__all__ = ["ClientRegistry"]
+
+_LOGGER = logging.getLogger(__name__)
+
+_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+class ClientRegistry(object):
+    """
+    Process-wide registry of credentials, discovery documents and clients.
+
+    Credentials (and the access token minted for them) are shared by every
+    connector using the same secret. Discovery clients and their authorized
+    http are shared by every thread when the HttpTransport is thread-safe, and
+    cached per thread otherwise. Both caches are bounded LRUs.
+    """
+
+    max_credentials = 256
+    max_clients = 1024
+
+    _lock = threading.Lock()
+    _credentials = OrderedDict()
+    _credential_locks = {}
+    _documents = {}
+    _clients = OrderedDict()
+    _https = OrderedDict()
+
+    @staticmethod
+    def hash_secret(secret_data: dict) -> str:
+        dumped = json.dumps(secret_data, sort_keys=True, default=str)
+        return hashlib.sha256(dumped.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_credentials(cls, secret_data: dict, secret_key: str = None):
+        secret_key = secret_key or cls.hash_secret(secret_data)
+        with cls._lock:
+            credentials = cls._credentials.get(secret_key)
+            if credentials is None:
+                # Scoped up front, otherwise build() scopes a copy per client
+                # and every thread would mint its own token.
+                from google.oauth2 import service_account
+
+                credentials = service_account.Credentials.from_service_account_info(
+                    secret_data, scopes=_SCOPES
+                )
+                cls._credentials[secret_key] = credentials
+                cls._credential_locks[secret_key] = threading.Lock()
+                if len(cls._credentials) > cls.max_credentials:
+                    expired_key, _ = cls._credentials.popitem(last=False)
+                    cls._credential_locks.pop(expired_key, None)
+            else:
+                cls._credentials.move_to_end(secret_key)
+            credential_lock = cls._credential_locks[secret_key]
+
+        # Mint the token once and let every client reuse it until it expires
+        with credential_lock:
+            if not credentials.valid:
+                credentials.refresh(
+                    google_auth_httplib2.Request(HttpTransport.get_default().get_http())
+                )
+        return credentials
+
+    @classmethod
+    def get_document(cls, service: str, version: str):
+        key = (service, version)
+        if key not in cls._documents:
+            from googleapiclient import discovery_cache
+
+            document = discovery_cache.get_static_doc(service, version)
+            if document is None:
+                _LOGGER.debug(
+                    f"[get_document] no static discovery document for {service} {version}"
+                )
+            elif GOOGLE_API_ROOT_URL:
+                document = json.loads(document)
+                document["rootUrl"] = document["mtlsRootUrl"] = GOOGLE_API_ROOT_URL.format(
+                    service=service
+                )
+                document = json.dumps(document)
+            cls._documents[key] = document
+        return cls._documents[key]
+
+    @classmethod
+    def get_client(
+        cls,
+        service: str,
+        version: str,
+        secret_key: str,
+        credentials,
+        model_class=JsonModel,
+    ):
+        key = (service, version, secret_key, model_class, cls._get_thread_key())
+        client = cls._get_cached(cls._clients, key)
+        if client is None:
+            # Built outside the lock, a concurrent duplicate is simply dropped
+            client = cls._build_client(
+                service, version, cls.get_http(secret_key, credentials), model_class
+            )
+            client = cls._set_cached(cls._clients, key, client)
+        return client
+
+    @classmethod
+    def get_http(cls, secret_key: str, credentials):
+        key = (secret_key, cls._get_thread_key())
+        http = cls._get_cached(cls._https, key)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=HttpTransport.get_default().get_http()
+            )
+            http = cls._set_cached(cls._https, key, http)
+        return http
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._credentials.clear()
+            cls._credential_locks.clear()
+            cls._documents.clear()
+            cls._clients.clear()
+            cls._https.clear()
+
+    @staticmethod
+    def _get_thread_key():
+        # httplib2 is not thread-safe, its clients are not shared between threads
+        if HttpTransport.get_default().thread_safe:
+            return None
+        return threading.get_ident()
+
+    @classmethod
+    def _get_cached(cls, cache: OrderedDict, key):
+        with cls._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    @classmethod
+    def _set_cached(cls, cache: OrderedDict, key, value):
+        with cls._lock:
+            value = cache.setdefault(key, value)
+            if len(cache) > cls.max_clients:
+                cache.popitem(last=False)
+            return value
+
+    @classmethod
+    def _build_client(cls, service: str, version: str, http, model_class):
+        import googleapiclient.discovery
+
+        document = cls.get_document(service, version)
+        if document is None:
+            return googleapiclient.discovery.build(
+                service, version, http=http, model=model_class(), cache_discovery=False
+            )
+        # Same data wrapping as the model build_from_document() would create
+        data_wrapper = "dataWrapper" in json.loads(document).get("features", [])
+        return googleapiclient.discovery.build_from_document(
+            document, http=http, model=model_class(data_wrapper)
+        )
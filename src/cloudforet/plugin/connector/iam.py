@@ -1,6 +1,13 @@
 import logging
 from spaceone.core import cache
+from cloudforet.plugin.config.global_conf import (
+    IAM_CUSTOM_ROLE_CACHE_TTL,
+    IAM_PREDEFINED_ROLE_CACHE_TTL,
+    IAM_ROLE_PAGE_SIZE,
+)
 from cloudforet.plugin.connector.base import GoogleCloudConnector
+from cloudforet.plugin.utils.permission_index import PermissionIndex
+from cloudforet.plugin.utils.ttl_cache import TTLCache
 
 
 
@@ -8,75 +15,114 @@ __all__ = ["IAMConnector"]
 
 _LOGGER = logging.getLogger("spaceone")
 
+# role name -> interned permission ids, shared by every collect in this process
+_ROLES_TO_PERMISSION_IDS_CACHE = TTLCache(max_size=1024)
+
 
 class IAMConnector(GoogleCloudConnector):
     google_client_service = "iam"
     version = "v1"
+    page_size = IAM_ROLE_PAGE_SIZE
+    cache_key_prefix = "google-recommender:iam-roles"
 
-    def list_predefined_roles(self):
-        roles = []
-        request = self.client.roles().list(pageSize=1000, view='FULL')
-
-        while True:
-            response = request.execute()
-
-            roles.extend(response.get("roles", []))
-
-            request = (
-                self.client.roles()
-                .list_next(previous_request=request, previous_response=response)
-            )
-
-            if request is None:
-                break
+    def verify(self):
+        request = self.client.projects().roles().list(
+            parent=f"projects/{self.project_id}", pageSize=1, fields="roles/name"
+        )
+        self.execute(request)
 
-        return roles
+    def list_predefined_roles(self):
+        return self.paginate(self.client.roles(), "roles", view='FULL')
 
     def list_project_roles(self, project_id: str = None):
         parent = f"projects/{project_id}"
-        roles = []
-        request = self.client.projects().roles().list(parent=parent, pageSize=1000, view='FULL')
-        while True:
-            response = request.execute()
-
-            roles.extend(response.get("roles", []))
-
-            request = (
-                self.client.projects()
-                .roles()
-                .list_next(previous_request=request, previous_response=response)
-            )
-
-            if request is None:
-                break
-
-        return roles
+        return self.paginate(
+            self.client.projects().roles(), "roles", parent=parent, view='FULL'
+        )
 
     def list_organization_roles(self, resource):
-        roles = []
-        request = self.client.organizations().roles().list(parent=resource, pageSize=1000, view='FULL')
-
-        while True:
-            response = request.execute()
-            roles.extend(response.get("roles", []))
-
-            request = (
-                self.client.organizations()
-                .roles()
-                .list_next(previous_request=request, previous_response=response)
-            )
-
-            if request is None:
-                break
-
-        return roles
-
-    def get_all_roles_to_permissions_dict(self, project_id: str, organization_id: str):
-        roles_to_permissions = {}
-        roles = self.list_predefined_roles()
-        roles.extend(self.list_project_roles(project_id))
+        return self.paginate(
+            self.client.organizations().roles(), "roles", parent=resource, view='FULL'
+        )
+
+    def get_predefined_roles_to_permission_ids_dict(self) -> dict:
+        return self._get_cached_roles_to_permission_ids(
+            "predefined",
+            IAM_PREDEFINED_ROLE_CACHE_TTL,
+            self.list_predefined_roles,
+        )
+
+    def get_project_roles_to_permission_ids_dict(self, project_id: str) -> dict:
+        return self._get_cached_roles_to_permission_ids(
+            f"projects/{project_id}",
+            IAM_CUSTOM_ROLE_CACHE_TTL,
+            lambda: self.list_project_roles(project_id),
+            secret_key=self.secret_key,
+        )
+
+    def get_organization_roles_to_permission_ids_dict(self, resource: str) -> dict:
+        return self._get_cached_roles_to_permission_ids(
+            resource,
+            IAM_CUSTOM_ROLE_CACHE_TTL,
+            lambda: self.list_organization_roles(resource),
+            secret_key=self.secret_key,
+        )
+
+    def get_all_roles_to_permission_ids_dict(
+        self, project_id: str, organization_id: str
+    ) -> dict:
+        roles_to_permission_ids = dict(
+            self.get_predefined_roles_to_permission_ids_dict()
+        )
+        roles_to_permission_ids.update(
+            self.get_project_roles_to_permission_ids_dict(project_id)
+        )
         if organization_id:
-            roles.extend(self.list_organization_roles(organization_id))
-        for role in roles:
-            roles_to_permissions[role.get("name")] = role.get("includedPermissions", [])
-        return roles_to_permissions
\ No newline at end of file
+            if not organization_id.startswith("organizations/"):
+                organization_id = f"organizations/{organization_id}"
+            roles_to_permission_ids.update(
+                self.get_organization_roles_to_permission_ids_dict(organization_id)
+            )
+        return roles_to_permission_ids
+
+    def _get_cached_roles_to_permission_ids(
+        self, parent: str, expire: int, list_roles, secret_key: str = None
+    ):
+        # Custom roles are keyed by secret as well, so a secret is never
+        # served roles it could not list itself.
+        cache_key = f"{self.cache_key_prefix}:{parent}"
+        if secret_key:
+            cache_key = f"{cache_key}:{secret_key}"
+
+        def _load():
+            # The cache backend keeps strings, ids are only valid in this process
+            roles_to_permissions = self._get_from_cache_backend(cache_key)
+            if roles_to_permissions is None:
+                roles_to_permissions = {
+                    role.get("name"): role.get("includedPermissions", [])
+                    for role in list_roles()
+                }
+                self._set_to_cache_backend(cache_key, roles_to_permissions, expire)
+            return {
+                role_name: PermissionIndex.intern_all(permissions)
+                for role_name, permissions in roles_to_permissions.items()
+            }
+
+        return _ROLES_TO_PERMISSION_IDS_CACHE.get_or_load(cache_key, _load, expire)
+
+    @staticmethod
+    def _get_from_cache_backend(cache_key: str):
+        try:
+            if cache.is_set():
+                return cache.get(cache_key)
+        except Exception as e:
+            _LOGGER.debug(f"[_get_from_cache_backend] {cache_key}: {e}")
+        return None
+
+    @staticmethod
+    def _set_to_cache_backend(cache_key: str, value, expire: int):
+        try:
+            if cache.is_set():
+                cache.set(cache_key, value, expire=expire)
+        except Exception as e:
+            _LOGGER.debug(f"[_set_to_cache_backend] {cache_key}: {e}")
@@ -0,0 +1,49 @@
+import json
+import logging
+
+from googleapiclient.model import JsonModel
+
+from cloudforet.plugin.config.global_conf import JSON_DECODER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ["FastJsonModel", "get_json_decoder"]
+
+_LOGGER = logging.getLogger(__name__)
+
+JSON_DECODERS = {"json": json.loads}
+if orjson is not None:
+    JSON_DECODERS["orjson"] = orjson.loads
+
+
+def get_json_decoder(name: str = JSON_DECODER):
+    """Returns the loads() of `name`, "auto" picks the fastest installed one"""
+    if name == "auto":
+        name = "orjson" if "orjson" in JSON_DECODERS else "json"
+    if name not in JSON_DECODERS:
+        _LOGGER.warning(f"[get_json_decoder] {name} is not installed, use json")
+        name = "json"
+    return JSON_DECODERS[name]
+
+
+class FastJsonModel(JsonModel):
+    """JsonModel decoding the response bodies with a faster decoder when installed"""
+
+    def __init__(self, data_wrapper: bool = False, loads=None):
+        super().__init__(data_wrapper)
+        self.loads = loads or get_json_decoder()
+
+    def deserialize(self, content):
+        try:
+            body = self.loads(content)
+        except ValueError:
+            # Not JSON, handed over as text like JsonModel does
+            if isinstance(content, bytes):
+                content = content.decode("utf-8")
+            return content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
@@ -0,0 +1,82 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudforet.plugin.config.global_conf import PAGINATOR_PREFETCH_WORKERS
+from cloudforet.plugin.utils.instrumentation import bind_context
+
+__all__ = ["Paginator"]
+
+_LOGGER = logging.getLogger(__name__)
+
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=PAGINATOR_PREFETCH_WORKERS, thread_name_prefix="paginator"
+)
+
+
+class Paginator(object):
+    """
+    Lazy iterator over the pages of a discovery `list` method.
+
+    Pages are fetched in the calling thread. With prefetch enabled, page N+1 is
+    also submitted to a small shared pool while the caller is still consuming
+    page N, at most one look-ahead per paginator. A look-ahead the pool has not
+    started yet is fetched by the caller instead, so the pool size never limits
+    the list calls in flight; those are bounded by the callers and the limiter.
+    `execute(request, http=None, **span_attributes)` gets the parent and page
+    index of every request for tracing.
+    """
+
+    def __init__(self, collection, execute, get_http=None, prefetch=True):
+        self.collection = collection
+        self.execute = execute
+        self.get_http = get_http
+        self.prefetch = prefetch and get_http is not None
+
+    def pages(self, **query):
+        parent = query.get("parent")
+        page_index = 0
+        response = self.execute(
+            self.collection.list(**query), parent=parent, page_index=page_index
+        )
+        future = None
+        try:
+            while True:
+                next_request = self._next_request(response, query)
+                page_index += 1
+                if self.prefetch and next_request is not None:
+                    future = _PREFETCH_EXECUTOR.submit(
+                        bind_context(self._fetch), next_request, parent, page_index
+                    )
+                yield response
+
+                if next_request is None:
+                    return
+                if future is None or future.cancel():
+                    response = self.execute(
+                        next_request, parent=parent, page_index=page_index
+                    )
+                else:
+                    response = future.result()
+                future = None
+        finally:
+            if future is not None:
+                future.cancel()
+
+    def items(self, items_key: str, **query):
+        for response in self.pages(**query):
+            yield from response.get(items_key, [])
+
+    def _fetch(self, request, parent, page_index):
+        return self.execute(
+            request, http=self.get_http(), parent=parent, page_index=page_index
+        )
+
+    def _next_request(self, response, query):
+        # list_next() cannot rebuild URLs with repeated parameters such as
+        # assetTypes, so the next request is built from the original query.
+        # The query may hold the token the listing started from (list_in_batch).
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return None
+        query = {key: value for key, value in query.items() if key != "pageToken"}
+        return self.collection.list(pageToken=page_token, **query)
@@ -0,0 +1,166 @@
+import logging
+import random
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from cloudforet.plugin.config.global_conf import (
+    API_MAX_RETRIES,
+    API_RATE_LIMITS,
+    API_RETRY_BASE_DELAY,
+    API_RETRY_MAX_DELAY,
+    DEFAULT_API_RATE_LIMIT,
+)
+from cloudforet.plugin.utils.error_handlers import (
+    is_quota_exceeded_error,
+    is_retryable_error,
+)
+from cloudforet.plugin.utils.instrumentation import record_metric
+
+__all__ = ["RateLimiter"]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimit(object):
+    """AIMD concurrency limit: grows by one per window of successes, halves on throttling"""
+
+    def __init__(self, min_concurrency: int, max_concurrency: int):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False):
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RateLimiter(object):
+    """
+    Client side quota of one Google API (recommender, cloudasset, iam).
+
+    Every request waits for a token and a concurrency slot. Throttled (429,
+    quota 403) and unavailable (5xx) responses shrink the concurrency limit and
+    are retried with jittered exponential backoff, honoring Retry-After.
+    """
+
+    _lock = threading.Lock()
+    _limiters = {}
+
+    def __init__(self, api: str):
+        limits = API_RATE_LIMITS.get(api, DEFAULT_API_RATE_LIMIT)
+        self.api = api
+        self.bucket = TokenBucket(limits["rate"], limits["burst"])
+        self.concurrency = AdaptiveConcurrencyLimit(
+            limits["min_concurrency"], limits["max_concurrency"]
+        )
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "failures": 0}
+
+    @classmethod
+    def get(cls, api: str):
+        with cls._lock:
+            if api not in cls._limiters:
+                cls._limiters[api] = cls(api)
+            return cls._limiters[api]
+
+    @classmethod
+    def get_all_stats(cls) -> dict:
+        with cls._lock:
+            limiters = list(cls._limiters.values())
+        return {limiter.api: dict(limiter.stats) for limiter in limiters}
+
+    def execute(self, func, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            throttled = False
+            try:
+                self._count("requests")
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise e
+
+                throttled = is_quota_exceeded_error(e) or self._is_unavailable(e)
+                if throttled:
+                    self._count("throttled")
+                if attempt >= API_MAX_RETRIES:
+                    self._count("failures")
+                    raise e
+
+                delay = self._get_retry_delay(e, attempt)
+                _LOGGER.debug(
+                    f"[RateLimiter] {self.api} retry {attempt + 1}/{API_MAX_RETRIES} in {delay:.2f}s: {e}"
+                )
+            finally:
+                self.concurrency.release(throttled=throttled)
+
+            self._count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+        if name == "requests":
+            record_metric("api_calls", service=self.api)
+        else:
+            record_metric(name)
+
+    @staticmethod
+    def _is_unavailable(e: Exception) -> bool:
+        return isinstance(e, HttpError) and e.resp.status == 503
+
+    @staticmethod
+    def _get_retry_delay(e: Exception, attempt: int) -> float:
+        if isinstance(e, HttpError):
+            retry_after = e.resp.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), API_RETRY_MAX_DELAY)
+                except ValueError:
+                    pass
+
+        # Full jitter exponential backoff
+        return random.uniform(
+            0, min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * (2 ** attempt))
+        )
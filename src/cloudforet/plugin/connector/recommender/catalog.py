@@ -0,0 +1,174 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+from spaceone.core.connector import BaseConnector
+
+from cloudforet.plugin.config.global_conf import (
+    CACHE_DIR,
+    RECOMMENDATION_MAP,
+    RECOMMENDATION_TYPE_DOCS_URL,
+    RECOMMENDER_CATALOG_RETRY_INTERVAL,
+    RECOMMENDER_CATALOG_TIMEOUT,
+    RECOMMENDER_CATALOG_TTL,
+    UNAVAILABLE_RECOMMENDER_IDS,
+)
+from cloudforet.plugin.connector.transport import HttpTransport, get_wire_size
+from cloudforet.plugin.utils.instrumentation import record_metric
+
+__all__ = ["RecommenderCatalogConnector"]
+_LOGGER = logging.getLogger(__name__)
+
+
+class RecommenderCatalogConnector(BaseConnector):
+    """
+    Recommender catalog crawled from the Google Cloud docs.
+
+    The parsed catalog is cached in memory and on disk. Once it expires it is
+    refreshed with a conditional GET, and any failure falls back to the stale
+    catalog or to the static RECOMMENDATION_MAP.
+    """
+
+    cache_file_name = "recommender_catalog.json"
+
+    _lock = threading.Lock()
+    _entry = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url = RECOMMENDATION_TYPE_DOCS_URL
+        self.cache_path = os.path.join(CACHE_DIR, self.cache_file_name)
+
+    def get_recommender_map(self) -> dict:
+        with self._lock:
+            entry = self._get_cached_entry()
+            if entry is None or entry["expires_at"] <= time.time():
+                entry = self._refresh(entry)
+                RecommenderCatalogConnector._entry = entry
+        return copy.deepcopy(entry["recommender_map"])
+
+    def _get_cached_entry(self):
+        if self._entry is None:
+            RecommenderCatalogConnector._entry = self._load_from_disk()
+        return self._entry
+
+    def _refresh(self, entry):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            res = HttpTransport.get_default().get_session().get(
+                self.url, headers=headers, timeout=RECOMMENDER_CATALOG_TIMEOUT
+            )
+            record_metric("api_calls", service="recommender_docs")
+            record_metric("bytes_decoded", len(res.content))
+            record_metric("bytes_received", get_wire_size(res))
+            if res.status_code == 304 and entry:
+                entry = dict(entry, expires_at=time.time() + RECOMMENDER_CATALOG_TTL)
+                self._save_to_disk(entry)
+                return entry
+
+            res.raise_for_status()
+            recommender_map = self._parse_recommender_map(res.content)
+            if not recommender_map:
+                raise ValueError("no recommenders found in the docs page")
+
+            entry = {
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "expires_at": time.time() + RECOMMENDER_CATALOG_TTL,
+                "recommender_map": recommender_map,
+            }
+            self._save_to_disk(entry)
+            return entry
+
+        except Exception as e:
+            _LOGGER.warning(
+                f"[get_recommender_map] failed to crawl {self.url}, use fallback catalog: {e}"
+            )
+            # Retry later instead of crawling again on every collect
+            fallback = dict(entry) if entry else {"recommender_map": RECOMMENDATION_MAP}
+            fallback["expires_at"] = time.time() + RECOMMENDER_CATALOG_RETRY_INTERVAL
+            return fallback
+
+    def _load_from_disk(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                entry = json.load(f)
+            if entry.get("recommender_map"):
+                return entry
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            _LOGGER.debug(f"[_load_from_disk] ignore broken catalog cache: {e}")
+        return None
+
+    def _save_to_disk(self, entry):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            _LOGGER.debug(f"[_save_to_disk] failed to write catalog cache: {e}")
+
+    @staticmethod
+    def _parse_recommender_map(content) -> dict:
+        recommender_map = {}
+        # Only needed when the catalog is crawled, which is rare
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, "html.parser")
+        table = soup.find("table")
+        if table is None:
+            return recommender_map
+        rows = table.find_all("tr")
+
+        category, name, recommender_id, short_description, etc = "", "", "", "", ""
+        for row in rows:
+            cols = row.find_all("td")
+            cols = [ele.text.strip() for ele in cols]
+            if cols:
+                try:
+                    category, name, recommender_id, short_description, etc = cols
+                except ValueError:
+                    try:
+                        name, recommender_id, short_description, etc = cols
+                    except ValueError:
+                        recommender_id, short_description, etc = cols
+
+                recommender_ids = []
+                if "Cloud SQL performance recommender" in name:
+                    name = "Cloud SQL performance recommender"
+                    short_description = "Improve Cloud SQL instance performance"
+                    recommender_ids = [
+                        "google.cloudsql.instance.PerformanceRecommender"
+                    ]
+                else:
+                    if recommender_id.count("google.") > 1:
+                        re_ids = recommender_id.split("google.")[1:]
+                        for re_id in re_ids:
+                            re_id = "google." + re_id
+                            if re_id not in UNAVAILABLE_RECOMMENDER_IDS:
+                                recommender_ids.append(re_id)
+                    else:
+                        if recommender_id not in UNAVAILABLE_RECOMMENDER_IDS:
+                            recommender_ids = [recommender_id]
+                        else:
+                            continue
+
+                for recommender_id in recommender_ids:
+                    recommender_map[recommender_id] = {
+                        "category": category,
+                        "name": name,
+                        "shortDescription": short_description,
+                    }
+        return recommender_map
@@ -1,4 +1,9 @@
 import logging
+from googleapiclient.errors import HttpError
+from cloudforet.plugin.config.global_conf import (
+    CLOUD_ASSET_LOCATION_FIELDS,
+    CLOUD_ASSET_PAGE_SIZE,
+)
 from cloudforet.plugin.connector.base import GoogleCloudConnector
 from cloudforet.plugin.utils.error_handlers import handle_403_exception
 
@@ -9,27 +14,51 @@ _LOGGER = logging.getLogger(__name__)
 class CloudAssetConnector(GoogleCloudConnector):
     google_client_service = "cloudasset"
     version = "v1"
+    page_size = CLOUD_ASSET_PAGE_SIZE
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def verify(self):
+        request = self.client.assets().list(
+            parent=f"projects/{self.project_id}",
+            contentType="RESOURCE",
+            pageSize=1,
+            fields="assets/name",
+        )
+        self.execute(request)
+
     @handle_403_exception(default_response=[])
     def list_assets_in_project(self, **query):
-        total_assets = []
         query.update(
             {
                 "parent": f"projects/{self.project_id}",
                 "contentType": "RESOURCE",
-                "pageSize": 1000,
             }
         )
-        request = self.client.assets().list(**query)
-
-        while request is not None:
-            response = request.execute()
-            for asset in response.get("assets", {}):
-                total_assets.append(asset)
-            request = self.client.assets().list_next(
-                previous_request=request, previous_response=response
+        yield from self.paginate(self.client.assets(), "assets", **query)
+
+    @handle_403_exception(default_response=[])
+    def list_asset_locations(self, asset_types: list = None, **query):
+        """Yields assets with only `assetType` and `resource.location` set"""
+        query.update(
+            {
+                "parent": f"projects/{self.project_id}",
+                "contentType": "RESOURCE",
+                "fields": CLOUD_ASSET_LOCATION_FIELDS,
+            }
+        )
+        if asset_types:
+            query["assetTypes"] = asset_types
+
+        try:
+            yield from self.paginate(self.client.assets(), "assets", **query)
+        except HttpError as e:
+            # assetTypes patterns matching no supported type are rejected
+            if not asset_types or e.resp.status != 400:
+                raise e
+            _LOGGER.debug(
+                f"[list_asset_locations] scan all asset types ({asset_types} rejected: {e})"
             )
-        return total_assets
+            query.pop("assetTypes")
+            yield from self.paginate(self.client.assets(), "assets", **query)
@@ -1,4 +1,5 @@
 import logging
+from cloudforet.plugin.config.global_conf import INSIGHT_PAGE_SIZE
 from cloudforet.plugin.connector.base import GoogleCloudConnector
 from cloudforet.plugin.utils.error_handlers import handle_403_exception
 
@@ -9,10 +10,22 @@ _LOGGER = logging.getLogger(__name__)
 class InsightConnector(GoogleCloudConnector):
     google_client_service = "recommender"
     version = "v1beta1"
+    page_size = INSIGHT_PAGE_SIZE
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def verify(self):
+        parent = f"projects/{self.project_id}/locations/global/insightTypes/google.iam.policy.Insight"
+        request = (
+            self.client.projects()
+            .locations()
+            .insightTypes()
+            .insights()
+            .list(parent=parent, pageSize=1, fields="insights/name")
+        )
+        self.execute(request)
+
     @handle_403_exception(default_response={})
     def get_policy_insight(self, insight_id: str, **query):
         insight_parent = f"projects/{self.project_id}/locations/global/insightTypes/google.iam.policy/insights/{insight_id}"
@@ -24,31 +37,23 @@ class InsightConnector(GoogleCloudConnector):
             .insights()
             .get(**query)
         )
-        response = request.execute()
+        response = self.execute(request)
         return response
 
     @handle_403_exception(default_response=[])
     def list_insights(self, insight_parent, **query):
-        insights = []
         query.update({"parent": insight_parent})
-        request = (
-            self.client.projects()
-            .locations()
-            .insightTypes()
-            .insights()
-            .list(**query)
+        yield from self.paginate(
+            self.client.projects().locations().insightTypes().insights(),
+            "insights",
+            **query,
         )
 
-        while request is not None:
-            response = request.execute()
-            insights.extend(
-                insight for insight in response.get("insights", [])
-            )
-            request = (
-                self.client.projects()
-                .locations()
-                .insightTypes()
-                .insights()
-                .list_next(previous_request=request, previous_response=response)
-            )
-        return insights
+    def list_insights_in_batch(self, insight_parents: list, **query):
+        """Yields (parent, insights, exception) using batch HTTP requests"""
+        yield from self.list_in_batch(
+            self.client.projects().locations().insightTypes().insights(),
+            "insights",
+            insight_parents,
+            **query,
+        )
@@ -1,4 +1,8 @@
 import logging
+from cloudforet.plugin.config.global_conf import (
+    RECOMMENDATION_PAGE_SIZE,
+    RECOMMENDATION_PRIORITIES,
+)
 from cloudforet.plugin.connector.base import GoogleCloudConnector
 from cloudforet.plugin.utils.error_handlers import handle_403_exception
 
@@ -9,32 +13,86 @@ _LOGGER = logging.getLogger(__name__)
 class RecommendationConnector(GoogleCloudConnector):
     google_client_service = "recommender"
     version = "v1beta1"
+    page_size = RECOMMENDATION_PAGE_SIZE
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.filter = self.get_filter(self.options)
+
+    @staticmethod
+    def get_filter(options: dict) -> str:
+        """
+        Builds the server-side `filter` of the recommendation listing from the
+        collect options, None when they do not restrict it.
+
+        options
+            - recommendation_states: ["ACTIVE", "CLAIMED", ...]
+            - recommendation_min_priority: "P2" (P1 and P2)
+        """
+        conditions = []
+        states = options.get("recommendation_states")
+        if states:
+            conditions.append(
+                " OR ".join(f"stateInfo.state = {state.upper()}" for state in states)
+            )
+
+        min_priority = options.get("recommendation_min_priority")
+        if min_priority:
+            min_priority = min_priority.upper()
+            if min_priority not in RECOMMENDATION_PRIORITIES:
+                raise ValueError(
+                    f"recommendation_min_priority must be one of {RECOMMENDATION_PRIORITIES}"
+                )
+            priorities = RECOMMENDATION_PRIORITIES[
+                : RECOMMENDATION_PRIORITIES.index(min_priority) + 1
+            ]
+            if len(priorities) < len(RECOMMENDATION_PRIORITIES):
+                conditions.append(
+                    " OR ".join(f"priority = {priority}" for priority in priorities)
+                )
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return " AND ".join(f"({condition})" for condition in conditions)
+
+    def verify(self, recommender_id: str = "google.iam.policy.Recommender"):
+        parent = f"projects/{self.project_id}/locations/global/recommenders/{recommender_id}"
+        request = self._get_collection(parent).list(
+            parent=parent, pageSize=1, fields="recommendations/name"
+        )
+        self.execute(request)
 
     @handle_403_exception(default_response=[])
     def list_recommendations(self, recommendation_parent, **query):
-        recommendations = []
+        yield from self.iter_recommendations(recommendation_parent, **query)
+
+    def iter_recommendations(self, recommendation_parent, **query):
+        """Same as list_recommendations, but raises when the parent is forbidden"""
         query.update({"parent": recommendation_parent})
-        request = (
-            self.client.projects()
-            .locations()
-            .recommenders()
-            .recommendations()
-            .list(**query)
+        if self.filter:
+            query.setdefault("filter", self.filter)
+        yield from self.paginate(
+            self._get_collection(recommendation_parent), "recommendations", **query
         )
 
-        while request is not None:
-            response = request.execute()
-            recommendations.extend([
-                recommendation for recommendation in response.get("recommendations", [])
-            ])
-            request = (
-                self.client.projects()
-                .locations()
-                .recommenders()
-                .recommendations()
-                .list_next(previous_request=request, previous_response=response)
+    def list_recommendations_in_batch(self, recommendation_parents: list, **query):
+        """Yields (parent, recommendations, exception) using batch HTTP requests"""
+        if self.filter:
+            query.setdefault("filter", self.filter)
+        parents_by_root = {}
+        for parent in recommendation_parents:
+            parents_by_root.setdefault(parent.split("/", 1)[0], []).append(parent)
+
+        for parents in parents_by_root.values():
+            yield from self.list_in_batch(
+                self._get_collection(parents[0]), "recommendations", parents, **query
             )
-        return recommendations
+
+    def _get_collection(self, recommendation_parent: str):
+        if recommendation_parent.startswith("organizations/"):
+            root = self.client.organizations()
+        else:
+            root = self.client.projects()
+        return root.locations().recommenders().recommendations()
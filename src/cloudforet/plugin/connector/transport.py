@@ -0,0 +1,178 @@
+import logging
+import threading
+
+import httplib2
+import requests
+from requests.adapters import HTTPAdapter
+
+from cloudforet.plugin.config.global_conf import (
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_TIMEOUT,
+    HTTP_TRANSPORT,
+)
+
+__all__ = [
+    "HttpTransport",
+    "Httplib2Transport",
+    "PooledHttp",
+    "PooledTransport",
+    "get_wire_size",
+]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HttpTransport(object):
+    """
+    Source of the httplib2 compatible http objects used by the Google API
+    clients, and of the requests sessions for plain HTTP calls. Sessions are
+    not thread-safe, so every thread gets its own.
+
+    The transport of the process is chosen by name through
+    RECOMMENDER_COLLECTOR_HTTP_TRANSPORT, or set with set_default().
+    """
+
+    transport_classes = {}
+    # Whether the http of get_http() can be used by several threads at once
+    thread_safe = False
+
+    _lock = threading.Lock()
+    _default = None
+
+    @classmethod
+    def register(cls, name: str, transport_class):
+        cls.transport_classes[name] = transport_class
+
+    @classmethod
+    def set_default(cls, transport):
+        with cls._lock:
+            cls._default = transport
+
+    @classmethod
+    def get_default(cls) -> "HttpTransport":
+        if cls._default is None:
+            with cls._lock:
+                if cls._default is None:
+                    if HTTP_TRANSPORT not in cls.transport_classes:
+                        raise ValueError(
+                            f"unknown RECOMMENDER_COLLECTOR_HTTP_TRANSPORT {HTTP_TRANSPORT!r}, "
+                            f"expected one of {sorted(cls.transport_classes)}"
+                        )
+                    cls._default = cls.transport_classes[HTTP_TRANSPORT]()
+        return cls._default
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get_http(self):
+        """Returns an object with the httplib2.Http request() interface"""
+        raise NotImplementedError
+
+    def get_session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._create_session()
+        return session
+
+    def _create_session(self) -> requests.Session:
+        return requests.Session()
+
+
+class Httplib2Transport(HttpTransport):
+    """An httplib2.Http per thread, since httplib2 is not thread-safe"""
+
+    def get_http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = httplib2.Http(timeout=HTTP_TIMEOUT)
+        return http
+
+
+class PooledTransport(HttpTransport):
+    """
+    One requests (urllib3) connection pool shared by every connector and
+    thread. Connections are kept alive per host, at most `pool_maxsize` per
+    host, and responses are requested gzip-compressed. The per-thread sessions
+    all mount the same adapter, which holds the pool.
+    """
+
+    thread_safe = True
+
+    def __init__(self, pool_hosts: int = HTTP_POOL_HOSTS, pool_maxsize: int = HTTP_POOL_MAXSIZE):
+        super().__init__()
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_hosts, pool_maxsize=pool_maxsize, pool_block=True
+        )
+        self._http = PooledHttp(self.get_session)
+
+    def get_http(self):
+        return self._http
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        return session
+
+
+def get_wire_size(res: requests.Response) -> int:
+    """Size of the body of a read response as received, before decompression"""
+    try:
+        return res.raw.tell()
+    except AttributeError:
+        return len(res.content)
+
+
+class PooledHttp(object):
+    """httplib2.Http look-alike sending its requests through the session of the calling thread"""
+
+    def __init__(self, get_session, timeout: float = HTTP_TIMEOUT):
+        self.get_session = get_session
+        self.timeout = timeout
+        self.follow_redirects = True
+        self.redirect_codes = frozenset((300, 301, 302, 303, 307, 308))
+        self.connections = {}
+
+    def request(
+        self,
+        uri,
+        method="GET",
+        body=None,
+        headers=None,
+        redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+        connection_type=None,
+    ):
+        try:
+            res = self.get_session().request(
+                method,
+                uri,
+                data=body,
+                headers=headers,
+                timeout=self.timeout,
+                allow_redirects=self.follow_redirects and redirections > 0,
+            )
+        except requests.exceptions.Timeout as e:
+            raise TimeoutError(str(e)) from e
+        except requests.exceptions.ConnectionError as e:
+            raise ConnectionError(str(e)) from e
+
+        content = res.content
+        response = httplib2.Response(dict(res.headers, status=res.status_code))
+        response.reason = res.reason
+        if "content-encoding" in response:
+            # Already decoded, report it the way httplib2 does, and keep the
+            # size on the wire, which httplib2 drops.
+            response["-content-encoding"] = response.pop("content-encoding")
+            response["-content-length"] = str(get_wire_size(res))
+            response["content-length"] = str(len(content))
+        return response, content
+
+    def close(self):
+        # The pool is shared with the other clients and stays open
+        pass
+
+
+HttpTransport.register("httplib2", Httplib2Transport)
+HttpTransport.register("pooled", PooledTransport)
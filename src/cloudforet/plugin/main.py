@@ -1,14 +1,31 @@
+import queue
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+from spaceone.core.error import ERROR_AUTHENTICATE_FAILURE
 from spaceone.inventory.plugin.collector.lib.server import CollectorPluginServer
 
-from cloudforet.plugin.manager import ResourceManager
+from cloudforet.plugin.config.global_conf import (
+    COLLECT_QUEUE_SIZE,
+    RECOMMENDATION_MAP,
+    RECOMMENDATION_PRIORITIES,
+    RECOMMENDATION_STATES,
+)
+from cloudforet.plugin.utils.instrumentation import (
+    CollectMetrics,
+    manager_scope,
+    measure_phase,
+    record_metric,
+)
 
 app = CollectorPluginServer()
 
 _LOGGER = logging.getLogger("spaceone")
 
+_MANAGER_DONE = object()
+
 
 @app.route("Collector.init")
 def collector_init(params: dict) -> dict:
@@ -17,7 +34,27 @@ def collector_init(params: dict) -> dict:
 
 @app.route("Collector.verify")
 def collector_verify(params: dict) -> None:
-    pass
+    options = params.get("options") or {}
+    secret_data = params["secret_data"]
+    schema = params.get("schema")
+
+    from cloudforet.plugin.manager import ResourceManager
+
+    # Probes the APIs, then warms the caches of this process, so the collect
+    # that follows on this pod starts with a token, catalogs and role catalog.
+    resource_mgrs = ResourceManager.list_managers(options)
+    if not resource_mgrs:
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=len(resource_mgrs), thread_name_prefix="verify"
+    ) as executor:
+        futures = [
+            executor.submit(_verify_manager, manager, options, secret_data, schema)
+            for manager in resource_mgrs
+        ]
+    for future in futures:
+        future.result()
 
 
 @app.route("Collector.collect")
@@ -25,27 +62,149 @@ def collector_collect(params: dict) -> dict:
     options = params["options"]
     secret_data = params["secret_data"]
     schema = params.get("schema")
+    task_options = params.get("task_options") or {}
+
+    # Imported here, Collector.init and verify do not need the managers
+    from cloudforet.plugin.manager import ResourceManager
+
+    resource_mgrs = ResourceManager.list_managers(options)
+    if task_options.get("manager"):
+        resource_mgrs = [
+            manager for manager in resource_mgrs if manager.accepts_task(task_options)
+        ]
+    yield from _collect_resources_in_parallel(
+        resource_mgrs, options, secret_data, schema, task_options
+    )
+
+
+@app.route("Job.get_tasks")
+def job_get_tasks(params: dict) -> dict:
+    options = params.get("options") or {}
+    secret_data = params["secret_data"]
+
+    from cloudforet.plugin.manager import ResourceManager
+
+    tasks = []
+    for manager in ResourceManager.list_managers(options):
+        for task_options in manager.get_tasks(options, secret_data):
+            tasks.append({"task_options": task_options})
+    return {"tasks": tasks}
 
-    resource_mgrs = ResourceManager.list_managers()
-    for manager in resource_mgrs:
-        start_time = time.time()
-        _LOGGER.debug(f"[START] Collect Resources (Service: {manager.service})")
-        results = manager().collect_resources(options, secret_data, schema)
 
-        for result in results:
-            yield result
+def _verify_manager(manager, options, secret_data, schema):
+    start_time = time.time()
+    resource_mgr = manager()
+    try:
+        resource_mgr.verify(options, secret_data, schema)
+    except Exception as e:
+        from cloudforet.plugin.utils.error_handlers import is_authentication_error
 
+        # Throttling, outages and bad options are reported as they are
+        if not is_authentication_error(e):
+            raise
+        raise ERROR_AUTHENTICATE_FAILURE(message=f"{manager.service}: {e}")
+
+    try:
+        resource_mgr.warm_up(options, secret_data, schema)
+    except Exception as e:
+        # The collect loads whatever could not be warmed
+        _LOGGER.warning(f"[_verify_manager] failed to warm up {manager.__name__}: {e}")
+    _LOGGER.debug(
+        f"[DONE] verify manager: {manager.__name__} Finished {time.time() - start_time:2f} Seconds"
+    )
+
+
+def _collect_resources_in_parallel(
+    resource_mgrs, options, secret_data, schema, task_options=None
+):
+    # Managers run in their own threads and share one bounded queue, so a slow
+    # consumer blocks the producers instead of buffering every response.
+    result_queue = queue.Queue(maxsize=COLLECT_QUEUE_SIZE)
+    stop_event = threading.Event()
+    collect_metrics = CollectMetrics(
+        project_id=secret_data.get("project_id"), task_options=task_options or {}
+    )
+    workers = [
+        threading.Thread(
+            target=_collect_resources_by_manager,
+            args=(
+                manager,
+                options,
+                secret_data,
+                schema,
+                task_options,
+                result_queue,
+                stop_event,
+                collect_metrics,
+            ),
+            name=f"manager-{manager.__name__}",
+            daemon=True,
+        )
+        for manager in resource_mgrs
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        running = len(workers)
+        while running:
+            result = result_queue.get()
+            if result is _MANAGER_DONE:
+                running -= 1
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                yield result
+    finally:
+        stop_event.set()
+        collect_metrics.finish()
+
+
+def _collect_resources_by_manager(
+    manager,
+    options,
+    secret_data,
+    schema,
+    task_options,
+    result_queue,
+    stop_event,
+    collect_metrics,
+):
+    start_time = time.time()
+    _LOGGER.debug(f"[START] Collect Resources (Service: {manager.service})")
+    try:
+        with manager_scope(collect_metrics, manager.__name__):
+            results = manager().collect_resources(
+                options, secret_data, schema, task_options=task_options
+            )
+            for result in results:
+                with measure_phase("response_emission", trace=False):
+                    record_metric("resources")
+                    if not _put_result(result_queue, result, stop_event):
+                        results.close()
+                        return
+    except Exception as e:
+        _put_result(result_queue, e, stop_event)
+    finally:
         _LOGGER.debug(
             f"[DONE] service: {manager.service}, manager: {manager} Finished {time.time() - start_time:2f} Seconds"
         )
+        _put_result(result_queue, _MANAGER_DONE, stop_event)
 
 
-@app.route("Job.get_tasks")
-def job_get_tasks(params: dict) -> dict:
-    pass
+def _put_result(result_queue, result, stop_event) -> bool:
+    while not stop_event.is_set():
+        try:
+            result_queue.put(result, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
 
 
 def _create_init_metadata():
+    from cloudforet.plugin.manager import MANAGER_NAMES
+
     return {
         "metadata": {
             "supported_resource_type": [
@@ -54,7 +213,61 @@ def _create_init_metadata():
                 "inventory.Region",
                 "inventory.ErrorResource",
             ],
-            "options_schema": {},
+            "options_schema": _create_options_schema(MANAGER_NAMES),
             "concurrency": 2,
         }
     }
+
+
+def _create_options_schema(manager_names: list) -> dict:
+    # Selections are applied before the requests are fanned out (CollectFilter)
+    categories = sorted({info["category"] for info in RECOMMENDATION_MAP.values()})
+    return {
+        "type": "object",
+        "order": [
+            "managers",
+            "recommender_categories",
+            "recommender_ids",
+            "locations",
+            "recommendation_states",
+            "recommendation_min_priority",
+        ],
+        "properties": {
+            "managers": {
+                "title": "Managers",
+                "type": "array",
+                "items": {"type": "string", "enum": manager_names},
+                "description": "Managers to run, all of them when empty",
+            },
+            "recommender_categories": {
+                "title": "Recommender categories",
+                "type": "array",
+                "items": {"type": "string", "enum": categories},
+                "description": "Collect only the recommenders of these categories",
+            },
+            "recommender_ids": {
+                "title": "Recommender IDs",
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Collect only these recommenders, e.g. google.compute.instance.IdleResourceRecommender",
+            },
+            "locations": {
+                "title": "Locations",
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Collect only these locations. A region includes its zones, and global must be listed for global recommenders such as IAM",
+            },
+            "recommendation_states": {
+                "title": "Recommendation states",
+                "type": "array",
+                "items": {"type": "string", "enum": RECOMMENDATION_STATES},
+                "description": "Collect only the recommendations in these states",
+            },
+            "recommendation_min_priority": {
+                "title": "Minimum priority",
+                "type": "string",
+                "enum": RECOMMENDATION_PRIORITIES,
+                "description": "Collect only the recommendations of this priority or higher",
+            },
+        },
+    }
@@ -1,3 +1,24 @@
+import importlib
+
 from cloudforet.plugin.manager.base import ResourceManager
-from cloudforet.plugin.manager.recommender.iam_management_manager import IAMManagementRecommendationManager
-from cloudforet.plugin.manager.recommender.all_recommendations_manager import AllRecommendationsManager
+
+# The managers pull in the Google API client libraries, so they are imported
+# on first use rather than when the plugin server starts.
+_MANAGER_MODULES = {
+    "IAMManagementRecommendationManager": "cloudforet.plugin.manager.recommender.iam_management_manager",
+    "AllRecommendationsManager": "cloudforet.plugin.manager.recommender.all_recommendations_manager",
+}
+
+
+MANAGER_NAMES = list(_MANAGER_MODULES)
+
+
+def load_managers():
+    for module_name in _MANAGER_MODULES.values():
+        importlib.import_module(module_name)
+
+
+def __getattr__(name):
+    if name in _MANAGER_MODULES:
+        return getattr(importlib.import_module(_MANAGER_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,6 +4,8 @@ from spaceone.core.manager import BaseManager
 from spaceone.inventory.plugin.collector.lib import *
 
 from cloudforet.plugin.config.global_conf import REGION_INFO
+from cloudforet.plugin.utils.collect_filter import CollectFilter
+from cloudforet.plugin.utils.error_handlers import is_forbidden_error
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,15 +22,61 @@ class ResourceManager(BaseManager):
         self.provider = "google_cloud"
         self.cloud_service_group = ""
         self.cloud_service_type = ""
+        self.task_options = {}
 
     @classmethod
-    def list_managers(cls):
-        return cls.__subclasses__()
+    def list_managers(cls, options: dict = None):
+        """Returns the manager subclasses, only the selected ones with `options`"""
+        if cls is ResourceManager:
+            from cloudforet.plugin.manager import load_managers
 
-    def collect_resources(self, options, secret_data, schema):
+            load_managers()
+
+        managers = cls.__subclasses__()
+        if options:
+            collect_filter = CollectFilter(options)
+            managers = [
+                manager for manager in managers if collect_filter.accepts_manager(manager)
+            ]
+        return managers
+
+    @classmethod
+    def get_tasks(cls, options, secret_data) -> list:
+        """Returns the task_options of the independently collectable tasks"""
+        return [{"manager": cls.__name__}]
+
+    @classmethod
+    def accepts_task(cls, task_options: dict) -> bool:
+        return task_options.get("manager") == cls.__name__
+
+    def verify(self, options, secret_data, schema):
+        """Checks that the secret can call every API this manager uses"""
+        pass
+
+    def verify_optional(self, connector, *args):
+        """
+        Verifies an API whose 403 the collect tolerates (handle_403_exception):
+        a forbidden secret only loses its resources, so it is logged, not raised.
+        """
+        try:
+            connector.verify(*args)
+        except Exception as e:
+            if not is_forbidden_error(e):
+                raise
+            _LOGGER.warning(
+                f"[verify] {self.service}: {type(connector).__name__} is forbidden, "
+                f"its resources will be skipped: {e}"
+            )
+
+    def warm_up(self, options, secret_data, schema):
+        """Fills the process-wide caches the first collect would otherwise fill"""
+        pass
+
+    def collect_resources(self, options, secret_data, schema, task_options=None):
         _LOGGER.debug(
-            f"[collect_resources] collect Field resources (options: {options})"
+            f"[collect_resources] collect Field resources (options: {options}, task_options: {task_options})"
         )
+        self.task_options = task_options or {}
         try:
             yield from self.collect_cloud_service_type()
             yield from self.collect_cloud_service(options, secret_data, schema)
@@ -51,27 +99,35 @@ class ResourceManager(BaseManager):
         )
 
     def collect_cloud_service(self, options, secret_data, schema):
-        total_resources = []
-        cloud_services, error_resources = self.create_cloud_service(
-            options, secret_data, schema
-        )
-        for cloud_service in cloud_services:
-            total_resources.append(
-                make_response(
-                    cloud_service=cloud_service,
-                    match_keys=[
-                        [
-                            "reference.resource_id",
-                            "provider",
-                            "cloud_service_type",
-                            "cloud_service_group",
-                        ]
-                    ],
-                )
+        yield from self.create_cloud_service(options, secret_data, schema)
+
+    def make_cloud_service_response(self, **kwargs):
+        try:
+            cloud_service = make_cloud_service(
+                cloud_service_type=self.cloud_service_type,
+                cloud_service_group=self.cloud_service_group,
+                provider=self.provider,
+                **kwargs,
+            )
+        except Exception as e:
+            return make_error_response(
+                error=e,
+                provider=self.provider,
+                cloud_service_group=self.cloud_service_group,
+                cloud_service_type=self.cloud_service_type,
             )
 
-        total_resources.extend(error_resources)
-        return total_resources
+        return make_response(
+            cloud_service=cloud_service,
+            match_keys=[
+                [
+                    "reference.resource_id",
+                    "provider",
+                    "cloud_service_type",
+                    "cloud_service_group",
+                ]
+            ],
+        )
 
     def collect_region(self):
         for region_code in self.collected_region_codes:
@@ -111,4 +167,5 @@ class ResourceManager(BaseManager):
 
     @abc.abstractmethod
     def create_cloud_service(self, options, secret_data, schema):
+        """Yields a cloud service (or error) response per collected resource"""
         raise NotImplementedError("method `create_cloud_service` should be implemented")
@@ -1,32 +1,47 @@
+import itertools
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from spaceone.inventory.plugin.collector.lib import *
 from cloudforet.plugin.manager.base import ResourceManager
 from cloudforet.plugin.config.global_conf import (
     ASSET_URL,
-    RECOMMENDATION_TYPE_DOCS_URL,
-    UNAVAILABLE_RECOMMENDER_IDS,
+    BATCH_REQUEST_SIZE,
+    CLOUD_ASSET_SERVICES,
+    DEFAULT_RECOMMENDER_CONCURRENCY,
+    RECOMMENDATION_FIELDS,
 )
 from abc import abstractmethod
 from cloudforet.plugin.connector.recommender.recommendation import (
     RecommendationConnector,
 )
 from cloudforet.plugin.connector.recommender.cloud_asset import CloudAssetConnector
-import requests
-from bs4 import BeautifulSoup
+from cloudforet.plugin.connector.recommender.catalog import RecommenderCatalogConnector
+from cloudforet.plugin.model import RecommendationRecord, intern_value
+from cloudforet.plugin.utils.collect_filter import CollectFilter
 from cloudforet.plugin.utils.converter import Converter
+from cloudforet.plugin.utils.error_handlers import is_forbidden_error
+from cloudforet.plugin.utils.instrumentation import (
+    bind_context,
+    measure_iter,
+    measure_phase,
+)
+from cloudforet.plugin.utils.negative_cache import NegativeCache
+
 _LOGGER = logging.getLogger(__name__)
 
 
 class AllRecommendationsManager(ResourceManager):
     service = "All Recommendations"
     category = None
+    # Partial response of the listing, extended by views parsing more fields
+    recommendation_fields = RECOMMENDATION_FIELDS
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.recommender_map = {}
         self.project_id = ""
-        self.rec_parent_to_recs = {}
         self.all_locations = []
         self.cloud_service_group = "Recommender"
         self.cloud_service_type = "AllRecommendations"
@@ -48,180 +63,330 @@ class AllRecommendationsManager(ResourceManager):
             labels=["Analytics"],
         )
 
+    @classmethod
+    def get_tasks(cls, options, secret_data) -> list:
+        # One task per recommender group (compute, cloudsql, ...). Groups map to
+        # disjoint cloud services, and each task only scans its own assets.
+        recommender_map = cls._select_recommenders(
+            RecommenderCatalogConnector().get_recommender_map(), CollectFilter(options)
+        )
+        recommender_groups = sorted(
+            {recommender_id.split(".")[1] for recommender_id in recommender_map}
+        )
+        return [
+            {"manager": cls.__name__, "recommender_groups": [recommender_group]}
+            for recommender_group in recommender_groups
+        ]
+
+    def verify(self, options, secret_data, schema):
+        recommender_ids = self._select_recommenders(
+            RecommenderCatalogConnector().get_recommender_map(), CollectFilter(options)
+        )
+        if not recommender_ids:
+            return
+        self.verify_optional(
+            CloudAssetConnector(options=options, secret_data=secret_data, schema=schema)
+        )
+        self.verify_optional(
+            RecommendationConnector(
+                options=options, secret_data=secret_data, schema=schema
+            ),
+            min(recommender_ids),
+        )
+
+    def warm_up(self, options, secret_data, schema):
+        RecommenderCatalogConnector().get_recommender_map()
+
     @classmethod
     def _is_category(cls, rec: dict) -> bool:
+        # The API reports "COST" where the catalog and the options say "Cost"
+        category = rec.get("primaryImpact", {}).get("category") or ""
         return (
             not cls.category  # All Recommendations
-            or rec.get("primaryImpact", {}).get("category") == cls.category
+            or category.lower() == cls.category.lower()
         )
 
     def create_cloud_service(self, options, secret_data, schema):
-        cloud_services, error_responses = [], []
         self.project_id = secret_data["project_id"]
         self.converter = Converter()
-        self.set_recommendation_id_map_by_crawling()
+
+        recommendation_parents, negative_cache = self.list_recommendation_parents(
+            options, secret_data, schema
+        )
+        recommendations = self.list_recommendations(
+            options,
+            secret_data,
+            schema,
+            recommendation_parents,
+            negative_cache,
+            fields=self.recommendation_fields,
+        )
+        try:
+            yield from self._make_product_service_responses(recommendations)
+        finally:
+            recommendations.close()
+
+    def _make_product_service_responses(self, recommendation_results):
+        # Parents are sorted by product/service, so a group is complete as soon
+        # as the next group starts and can be yielded right away.
+        current_group, rec_infos = None, []
+        for rec_parent, recommendations in measure_iter(
+            recommendation_results, "recommendation_fetch"
+        ):
+            with measure_phase("aggregation", trace=False):
+                group = self._get_product_and_service(rec_parent)
+                response = None
+                if group != current_group:
+                    if rec_infos:
+                        response = self._make_product_service_response(
+                            *current_group, rec_infos
+                        )
+                    current_group, rec_infos = group, []
+
+                if self.category:
+                    recommendations = [
+                        rec for rec in recommendations if self._is_category(rec)
+                    ]
+                if recommendations:
+                    rec_infos.extend(
+                        self._parse_recommendations(rec_parent, recommendations)
+                    )
+            if response:
+                yield response
+
+        if rec_infos:
+            with measure_phase("aggregation", trace=False):
+                response = self._make_product_service_response(*current_group, rec_infos)
+            yield response
+
+    def list_recommendation_parents(self, options, secret_data, schema):
+        """Crawls the recommenders and returns the parents to fetch, in product/service order"""
+        collect_filter = CollectFilter(options)
+        with measure_phase("crawl"):
+            self.set_recommendation_id_map_by_crawling(collect_filter)
+        if not self.recommender_map:
+            # Nothing selected, an empty asset type list would scan every asset
+            return [], None
 
         cloud_asset_conn = CloudAssetConnector(
             options=options, secret_data=secret_data, schema=schema
         )
 
-        assets = [asset for asset in cloud_asset_conn.list_assets_in_project()]
-
-        self._create_location_field_to_recommendation_map(assets)
+        # Locations are aggregated while the scan pages through the assets
+        assets = cloud_asset_conn.list_asset_locations(
+            self._list_location_asset_types()
+        )
+        with measure_phase("location_map"):
+            self._create_location_field_to_recommendation_map(
+                measure_iter(assets, "asset_scan")
+            )
         self.all_locations = ["global"]
-        recommendation_parents = self._create_parents_for_request_params()
 
+        with measure_phase("parent_fanout"):
+            recommendation_parents = self._create_parents_for_request_params(
+                collect_filter
+            )
+
+            negative_cache = None
+            if options.get("use_negative_cache", True):
+                # Parents empty under a filter may not be empty without it
+                recommendation_filter = RecommendationConnector.get_filter(options)
+                namespace = "recommender_parents"
+                if recommendation_filter:
+                    namespace = f"{namespace}:{recommendation_filter}"
+                negative_cache = NegativeCache(self.project_id, namespace)
+                recommendation_parents = negative_cache.filter_parents(
+                    recommendation_parents
+                )
+            recommendation_parents = self._sort_parents_by_product_service(
+                recommendation_parents
+            )
+        return recommendation_parents, negative_cache
+
+    def list_recommendations(
+        self,
+        options,
+        secret_data,
+        schema,
+        recommendation_parents,
+        negative_cache,
+        **query,
+    ):
+        """Yields (parent, recommendations) of every parent, in the given order"""
         recommendation_conn = RecommendationConnector(
             options=options, secret_data=secret_data, schema=schema
         )
 
-        for recommendation_parent in recommendation_parents:
-            recommendations = recommendation_conn.list_recommendations(
-                recommendation_parent
+        concurrency = options.get(
+            "recommender_concurrency", DEFAULT_RECOMMENDER_CONCURRENCY
+        )
+        batch_size = BATCH_REQUEST_SIZE if options.get("batch_requests") else 0
+        yield from self._list_recommendations_by_parents(
+            recommendation_conn,
+            recommendation_parents,
+            concurrency,
+            negative_cache,
+            batch_size,
+            query,
+        )
+
+        if negative_cache:
+            negative_cache.save()
+
+    def _parse_recommendations(self, rec_parent: str, recommendations: list) -> list:
+        rec_infos = []
+        recommender_id = rec_parent.split("/")[-1]
+        location = rec_parent.split("/locations/")[1].split("/")[0]
+        recommender_info = self.recommender_map.get(recommender_id, {})
+        recommender_name = recommender_info.get("name")
+        short_description = recommender_info.get("shortDescription")
+        location = intern_value(location)
+        for rec in recommendations:
+            rec_info = self._parse_recommendation(rec)
+            rec_info = self._add_category_specific_data(rec_info, rec)
+            rec_info.short_description = short_description
+            rec_info.recommender_name = recommender_name
+            rec_info.location = location
+            rec_infos.append(rec_info)
+        return rec_infos
+
+    def _make_product_service_response(
+        self, product: str, product_service: str, rec_infos: list
+    ) -> dict:
+        overall_values = self._get_overall_values(rec_infos)
+        data = {
+            "recommendations": [rec_info.to_dict() for rec_info in rec_infos],
+            "overallLocation": overall_values["location"],
+            "overallLastRefreshTime": overall_values["lastRefreshTime"],
+            "overallPriority": overall_values["priority"],
+            "overallStates": overall_values["states"],
+            "overallCategories": overall_values["categories"],
+            "overallImpacts": overall_values["impacts"],
+        }
+        return self.make_cloud_service_response(
+            name=f"{product} > {product_service}",
+            account=self.project_id,
+            data=data,
+            region_code=data.get("overallLocation"),
+            instance_type="",
+            instance_size=0,
+            reference={
+                "resource_id": f"{product}.{product_service}",
+                "external_link": f"https://console.cloud.google.com/active-assist/list/cost/\
+recommendations?project={self.project_id}",
+            },
+        )
+
+    def _get_product_and_service(self, rec_parent: str) -> tuple:
+        recommender_id = rec_parent.split("/")[-1]
+        product, product_service = recommender_id.split(".")[:2]
+        product = self.converter.convert_product_or_product_service_name(product)
+        product_service = self.converter.convert_product_or_product_service_name(
+            product_service
+        )
+        return product, product_service
+
+    def _sort_parents_by_product_service(self, recommendation_parents: list) -> list:
+        group_order = {}
+        for rec_parent in recommendation_parents:
+            group_order.setdefault(
+                self._get_product_and_service(rec_parent), len(group_order)
             )
-            if recommendations:
-                self.rec_parent_to_recs[recommendation_parent] = recommendations
-
-        prd_serv_recs = {}
-
-        for rec_parent in self.rec_parent_to_recs:
-            if not self._is_category(self.rec_parent_to_recs[rec_parent][0]):
-                continue
-            recommender_id = rec_parent.split("/")[-1]
-            product, product_service = recommender_id.split(".")[:2]
-            product = self.converter.convert_product_or_product_service_name(product)
-            product_service = self.converter.convert_product_or_product_service_name(product_service)
-            location = rec_parent.split("/locations/")[1].split("/")[0]
-            if product not in prd_serv_recs:
-                prd_serv_recs[product] = {}
-            if product_service not in prd_serv_recs[product]:
-                prd_serv_recs[product][product_service] = []
-
-            recommender_info = self.recommender_map.get(recommender_id, {})
-            recommender_name = recommender_info.get("name")
-            short_description = recommender_info.get("shortDescription")
-            for rec in self.rec_parent_to_recs[rec_parent]:
-                rec_info = self._parse_recommendation(rec)
-                rec_info = self._add_category_specific_data(rec_info, rec)
-                rec_info["shortDescription"] = short_description
-                rec_info["recommenderName"] = recommender_name
-                rec_info["location"] = location
-                prd_serv_recs[product][product_service].append(rec_info)
-
-        for product in prd_serv_recs:
-            for product_service in prd_serv_recs[product]:
-                rec_infos = prd_serv_recs[product][product_service]
-                overall_values = self._get_overall_values(rec_infos)
-                data = {
-                    "recommendations": rec_infos,
-                    "overallLocation": overall_values["location"],
-                    "overallLastRefreshTime": overall_values["lastRefreshTime"],
-                    "overallPriority": overall_values["priority"],
-                    "overallStates": overall_values["states"],
-                    "overallCategories": overall_values["categories"],
-                    "overallImpacts": overall_values["impacts"],
-                }
+        return sorted(
+            recommendation_parents,
+            key=lambda rec_parent: group_order[self._get_product_and_service(rec_parent)],
+        )
+
+    @staticmethod
+    def _list_recommendations_by_parents(
+        recommendation_conn,
+        recommendation_parents,
+        concurrency,
+        negative_cache=None,
+        batch_size=0,
+        query=None,
+    ):
+        query = query or {}
+
+        def _record(parent, recommendations, error):
+            if error is not None:
+                if not is_forbidden_error(error):
+                    raise error
+                reason = NegativeCache.FORBIDDEN
+            else:
+                reason = None if recommendations else NegativeCache.EMPTY
+
+            if negative_cache:
+                negative_cache.record(parent, reason)
+            return parent, recommendations
+
+        def _list_recommendations(parents):
+            if batch_size:
+                return [
+                    _record(*result)
+                    for result in recommendation_conn.list_recommendations_in_batch(
+                        parents, **query
+                    )
+                ]
+
+            results = []
+            for parent in parents:
                 try:
-                    cloud_services.append(
-                        make_cloud_service(
-                            name=f"{product} > {product_service}",
-                            cloud_service_type=self.cloud_service_type,
-                            cloud_service_group=self.cloud_service_group,
-                            provider=self.provider,
-                            account=self.project_id,
-                            data=data,
-                            region_code=data.get("overallLocation"),
-                            instance_type="",
-                            instance_size=0,
-                            reference={
-                                "resource_id": f"{product}.{product_service}",
-                                "external_link": f"https://console.cloud.google.com/active-assist/list/cost/\
-recommendations?project={self.project_id}",
-                            },
-                        )
+                    recommendations = list(
+                        recommendation_conn.iter_recommendations(parent, **query)
                     )
                 except Exception as e:
-                    error_responses.append(
-                        make_error_response(
-                            error=e,
-                            provider=self.provider,
-                            cloud_service_group=self.cloud_service_group,
-                            cloud_service_type=self.cloud_service_type,
-                        )
-                    )
-        return cloud_services, error_responses
-
-    def set_recommendation_id_map_by_crawling(self):
-        res = requests.get(RECOMMENDATION_TYPE_DOCS_URL)
-        soup = BeautifulSoup(res.content, "html.parser")
-        table = soup.find("table")
-        rows = table.find_all("tr")
-
-        category, name, recommender_id, short_description, etc = "", "", "", "", ""
-        for row in rows:
-            cols = row.find_all("td")
-            cols = [ele.text.strip() for ele in cols]
-            if cols:
-                try:
-                    category, name, recommender_id, short_description, etc = cols
-                except ValueError:
-                    try:
-                        name, recommender_id, short_description, etc = cols
-                    except ValueError:
-                        recommender_id, short_description, etc = cols
-
-                recommender_ids = []
-                if "Cloud SQL performance recommender" in name:
-                    name = "Cloud SQL performance recommender"
-                    short_description = "Improve Cloud SQL instance performance"
-                    recommender_ids = [
-                        "google.cloudsql.instance.PerformanceRecommender"
-                    ]
+                    results.append(_record(parent, [], e))
                 else:
-                    if recommender_id.count("google.") > 1:
-                        re_ids = recommender_id.split("google.")[1:]
-                        for re_id in re_ids:
-                            re_id = "google." + re_id
-                            if re_id not in UNAVAILABLE_RECOMMENDER_IDS:
-                                recommender_ids.append(re_id)
-                    else:
-                        if recommender_id not in UNAVAILABLE_RECOMMENDER_IDS:
-                            recommender_ids = [recommender_id]
-                        else:
-                            continue
-
-                for recommender_id in recommender_ids:
-                    self.recommender_map[recommender_id] = {
-                        "category": category,
-                        "name": name,
-                        "shortDescription": short_description,
-                    }
-
-    def _parse_recommendation(self, rec: dict) -> dict:
-        data = {
-            "name": rec.get("name"),
-            "category": rec.get("primaryImpact", {}).get("category"),
-            "longDescription": rec.get("description"),
-            "subtype": rec.get("recommenderSubtype"),
-            "resource": rec.get("content", {})
-            .get("operationGroups", [{}])[0]
-            .get("operations", [{}])[0]
-            .get("resource")
-            .split("/")[-1],
-            "state": rec.get("stateInfo", {}).get("state"),
-            "associatedInsights": [
-                insight.get("insight") for insight in rec.get("associatedInsights", [])
-            ],
-            "priority": rec.get("priority"),
-            "lastRefreshTime": rec.get("lastRefreshTime"),
-        }
+                    results.append(_record(parent, recommendations, None))
+            return results
+
+        chunk_size = batch_size or 1
+        chunks = iter(
+            [
+                recommendation_parents[start : start + chunk_size]
+                for start in range(0, len(recommendation_parents), chunk_size)
+            ]
+        )
+        max_workers = max(1, min(int(concurrency), len(recommendation_parents) or 1))
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="recommender"
+        ) as executor:
+            # Keep a bounded window of requests in flight and hand the results
+            # back in parent order, so memory does not grow with the parents.
+            pending = deque(
+                executor.submit(bind_context(_list_recommendations), chunk)
+                for chunk in itertools.islice(chunks, max_workers * 2)
+            )
+            while pending:
+                future = pending.popleft()
+                for chunk in itertools.islice(chunks, 1):
+                    pending.append(
+                        executor.submit(bind_context(_list_recommendations), chunk)
+                    )
+                yield from future.result()
+
+    def set_recommendation_id_map_by_crawling(self, collect_filter: CollectFilter = None):
+        # Unselected recommenders are dropped before their asset types are scanned
+        self.recommender_map = self._select_recommenders(
+            RecommenderCatalogConnector().get_recommender_map(),
+            collect_filter or CollectFilter(),
+        )
 
+        recommender_groups = self.task_options.get("recommender_groups")
+        if recommender_groups:
+            self.recommender_map = {
+                recommender_id: recommender_info
+                for recommender_id, recommender_info in self.recommender_map.items()
+                if recommender_id.split(".")[1] in recommender_groups
+            }
+
+    def _parse_recommendation(self, rec: dict) -> RecommendationRecord:
         associated_insights = []
         for insight_dic in rec.get("associatedInsights", []):
             insight_id = insight_dic.get("insight")
             if insight_id:
                 associated_insights.append(insight_id)
-        data["associatedInsights"] = associated_insights
 
         impact = rec.get("primaryImpact", {})
         impact_field_names = impact.keys()
@@ -229,11 +394,28 @@ recommendations?project={self.project_id}",
             if field_name.endswith("Projection"):
                 impact = impact.get(field_name)
                 break
-        data["impact"] = impact
-        return data
+
+        return RecommendationRecord(
+            name=rec.get("name"),
+            category=intern_value(rec.get("primaryImpact", {}).get("category")),
+            long_description=rec.get("description"),
+            subtype=intern_value(rec.get("recommenderSubtype")),
+            resource=rec.get("content", {})
+            .get("operationGroups", [{}])[0]
+            .get("operations", [{}])[0]
+            .get("resource")
+            .split("/")[-1],
+            state=intern_value(rec.get("stateInfo", {}).get("state")),
+            associated_insights=associated_insights,
+            priority=intern_value(rec.get("priority")),
+            last_refresh_time=rec.get("lastRefreshTime"),
+            impact=impact,
+        )
 
     @abstractmethod
-    def _add_category_specific_data(self, data: dict, rec: dict) -> dict:
+    def _add_category_specific_data(
+        self, data: RecommendationRecord, rec: dict
+    ) -> RecommendationRecord:
         return data
 
     @staticmethod
@@ -250,17 +432,17 @@ recommendations?project={self.project_id}",
             set(),
         )
         for rec in recs:
-            locations.add(rec.get("location"))
-            last_refresh_times.add(rec.get("lastRefreshTime"))
-            if not rec.get("lastRefreshTime"):
+            locations.add(rec.location)
+            last_refresh_times.add(rec.last_refresh_time)
+            if not rec.last_refresh_time:
                 return rec
-            priority = rec.get("priority")
+            priority = rec.priority
             if priority in priorities:
                 priorities[priority] += 1
             else:
                 priorities[priority] = 1
-            states.add(rec.get("state"))
-            categories.add(rec.get("category"))
+            states.add(rec.state)
+            categories.add(rec.category)
         states, categories = list(states), list(categories)
         states.sort()
         categories.sort()
@@ -277,16 +459,39 @@ recommendations?project={self.project_id}",
     def _get_overall_impacts(self, recs: list) -> str:
         return ""
 
-    def _create_parents_for_request_params(self):
+    @staticmethod
+    def _select_recommenders(recommender_map: dict, collect_filter: CollectFilter) -> dict:
+        return {
+            recommender_id: recommender_info
+            for recommender_id, recommender_info in recommender_map.items()
+            if collect_filter.accepts_recommender(
+                recommender_id, recommender_info.get("category")
+            )
+        }
+
+    def _create_parents_for_request_params(self, collect_filter: CollectFilter = None):
+        collect_filter = collect_filter or CollectFilter()
         recommendation_parents = []
         for recommender_id, recommender_info in self.recommender_map.items():
             locations = recommender_info.get("locations", self.all_locations)
             for region_or_zone in locations:
+                if not collect_filter.accepts_location(region_or_zone):
+                    continue
                 recommendation_parents.append(
                     f"projects/{self.project_id}/locations/{region_or_zone}/recommenders/{recommender_id}"
                 )
         return recommendation_parents
 
+    def _list_location_asset_types(self) -> list:
+        asset_services = set()
+        for recommender_id in self.recommender_map:
+            cloud_service_group = recommender_id.split(".")[1]
+            if cloud_service_group == "cloudsql":
+                cloud_service_group = "sqladmin"
+            if cloud_service_group in CLOUD_ASSET_SERVICES:
+                asset_services.add(cloud_service_group)
+        return [f"{service}.googleapis.com.*" for service in sorted(asset_services)]
+
     def _create_location_field_to_recommendation_map(self, assets):
         parents_and_locations_map = (
             self._create_parents_and_location_map_by_cloud_asset_api(assets)
@@ -300,7 +505,7 @@ recommendations?project={self.project_id}",
         parents_and_locations_map = {}
         for asset in assets:
             asset_type = asset["assetType"]
-            locations = asset["resource"].get("location", "global")
+            locations = asset.get("resource", {}).get("location", "global")
 
             service, cloud_service_type = asset_type.split("/")
             cloud_service_group, postfix = service.split(".", 1)
@@ -1,16 +1,33 @@
 import logging
+from array import array
 from spaceone.inventory.plugin.collector.lib import *
-from cloudforet.plugin.config.global_conf import ASSET_URL
+from cloudforet.plugin.config.global_conf import (
+    ASSET_URL,
+    IAM_INSIGHT_FIELDS,
+    IAM_RECOMMENDATION_FIELDS,
+    RECOMMENDATION_MAP,
+)
 from cloudforet.plugin.connector.recommender.insight import InsightConnector
 from cloudforet.plugin.connector.iam import IAMConnector
 from cloudforet.plugin.connector.recommender.recommendation import (
     RecommendationConnector,
 )
 from cloudforet.plugin.manager import ResourceManager
+from cloudforet.plugin.model import (
+    RoleRecommendationRecord,
+    ServiceAccountInsightRecord,
+    intern_value,
+)
+from cloudforet.plugin.utils.collect_filter import CollectFilter
 from cloudforet.plugin.utils.converter import Converter
+from cloudforet.plugin.utils.error_handlers import is_forbidden_error
+from cloudforet.plugin.utils.instrumentation import measure_iter, measure_phase
+from cloudforet.plugin.utils.permission_index import PermissionIndex
 
 _LOGGER = logging.getLogger(__name__)
 
+IAM_RECOMMENDER_ID = "google.iam.policy.Recommender"
+
 
 class IAMManagementRecommendationManager(ResourceManager):
     service = "IAM Management"
@@ -24,9 +41,36 @@ class IAMManagementRecommendationManager(ResourceManager):
         )
         self.project_id = None
         self.organization_id = None
-        self.all_roles_to_permissions = {}
+        self.all_roles_to_permission_ids = {}
         self.converter = None
 
+    @staticmethod
+    def _is_selected(collect_filter: CollectFilter) -> bool:
+        # The IAM recommender only has the global location
+        return collect_filter.accepts_recommender(
+            IAM_RECOMMENDER_ID, RECOMMENDATION_MAP[IAM_RECOMMENDER_ID]["category"]
+        ) and collect_filter.accepts_location("global")
+
+    def verify(self, options, secret_data, schema):
+        if not self._is_selected(CollectFilter(options)):
+            return
+        IAMConnector(options=options, secret_data=secret_data, schema=schema).verify()
+        for connector_class in (InsightConnector, RecommendationConnector):
+            self.verify_optional(
+                connector_class(options=options, secret_data=secret_data, schema=schema)
+            )
+
+    def warm_up(self, options, secret_data, schema):
+        if not self._is_selected(CollectFilter(options)):
+            return
+        iam_connector = IAMConnector(
+            options=options, secret_data=secret_data, schema=schema
+        )
+        iam_connector.get_all_roles_to_permission_ids_dict(
+            project_id=secret_data.get("project_id"),
+            organization_id=secret_data.get("organization_id"),
+        )
+
     def create_cloud_service_type(self):
         return make_cloud_service_type(
             name=self.cloud_service_type,
@@ -41,163 +85,179 @@ class IAMManagementRecommendationManager(ResourceManager):
         )
 
     def create_cloud_service(self, options, secret_data, schema):
-        cloud_services = []
-        error_responses = []
         self.project_id = secret_data.get("project_id")
         self.organization_id = secret_data.get("organization_id")
+        if not self._is_selected(CollectFilter(options)):
+            # The IAM recommender is not selected, and neither are its insights
+            return
+
         member_to_role_to_data = {}
         member_to_overall_values = {}
         iam_connector = IAMConnector(
             options=options, secret_data=secret_data, schema=schema
         )
-        self.all_roles_to_permissions = iam_connector.get_all_roles_to_permissions_dict(
-            project_id=self.project_id, organization_id=self.organization_id
-        )
-        revoked_policy_insights, revoked_service_account_insights = self._list_insights(
-            options, secret_data, schema
-        )
-        recs = self.list_recommendations(options, secret_data, schema)
+        with measure_phase("iam_role_catalog"):
+            self.all_roles_to_permission_ids = (
+                iam_connector.get_all_roles_to_permission_ids_dict(
+                    project_id=self.project_id, organization_id=self.organization_id
+                )
+            )
+        with measure_phase("insights"):
+            (
+                revoked_policy_insights,
+                revoked_service_account_insights,
+            ) = self._list_insights(options, secret_data, schema)
+        with measure_phase("recommendation_fetch"):
+            recs = self.list_recommendations(options, secret_data, schema)
         self.converter = Converter()
 
-        for rec in recs:
-            data = self._parse_recommendation(rec)
-            member_id = data.pop("memberId")
-            member_type = data.pop("memberType")
-            role_name = data.pop("roleName")
-            if member_id not in member_to_role_to_data:
-                member_to_role_to_data[member_id] = {}
-                member_to_overall_values[member_id] = {
-                    "totalUnusedPermissionsCount": 0,
-                    "rolesCount": 0,
-                    "_priority_count": 0,
-                    "_priority_sum": 0,
-                    "insightSubtypes": ["PERMISSIONS USAGE"],
-                    "memberType": member_type,
-                }
+        # The insights are paged lazily while they are merged below
+        revoked_policy_insights = measure_iter(revoked_policy_insights, "insights")
+        revoked_service_account_insights = measure_iter(
+            revoked_service_account_insights, "insights"
+        )
+        with measure_phase("aggregation"):
+            for rec in recs:
+                member_id, member_type, role_name, record = self._parse_recommendation(
+                    rec
+                )
+                if member_id not in member_to_role_to_data:
+                    member_to_role_to_data[member_id] = {}
+                    member_to_overall_values[member_id] = {
+                        "totalUnusedPermissionsCount": 0,
+                        "rolesCount": 0,
+                        "_priority_count": 0,
+                        "_priority_sum": 0,
+                        "insightSubtypes": ["PERMISSIONS USAGE"],
+                        "memberType": member_type,
+                    }
 
-            if role_name in member_to_role_to_data[member_id]:
-                for rest_data in member_to_role_to_data[member_id][role_name]:
-                    if rest_data["lastRefreshTime"] < data["lastRefreshTime"]:
-                        member_to_overall_values[member_id][
-                            "totalUnusedPermissionsCount"
-                        ] -= rest_data["unusedPermissionsCount"]
-                        member_to_overall_values[member_id]["rolesCount"] -= 1
-                        member_to_overall_values[member_id]["_priority_count"] -= 1
-                        member_to_overall_values[member_id]["_priority_sum"] -= int(
-                            rest_data["priority"][1]
-                        )
-                        break
+                overall_values = member_to_overall_values[member_id]
+                rest_record = member_to_role_to_data[member_id].get(role_name)
+                if rest_record is not None:
+                    # Keep only the most recent recommendation of a role
+                    if (rest_record.last_refresh_time or "") >= (
+                        record.last_refresh_time or ""
+                    ):
+                        continue
+                    overall_values[
+                        "totalUnusedPermissionsCount"
+                    ] -= rest_record.unused_permissions_count
+                    overall_values["rolesCount"] -= 1
+                    overall_values["_priority_count"] -= 1
+                    overall_values["_priority_sum"] -= int(rest_record.priority[1])
 
-            member_to_role_to_data[member_id][role_name] = data
-            member_to_overall_values[member_id]["totalUnusedPermissionsCount"] += data[
-                "unusedPermissionsCount"
-            ]
-            member_to_overall_values[member_id]["rolesCount"] += 1
-            member_to_overall_values[member_id]["_priority_count"] += 1
-            member_to_overall_values[member_id]["_priority_sum"] += int(
-                data["priority"][1]
-            )
+                member_to_role_to_data[member_id][role_name] = record
+                overall_values[
+                    "totalUnusedPermissionsCount"
+                ] += record.unused_permissions_count
+                overall_values["rolesCount"] += 1
+                overall_values["_priority_count"] += 1
+                overall_values["_priority_sum"] += int(record.priority[1])
 
-        for insight in revoked_policy_insights:
-            perm_data = self._parse_permission_usage_insights(insight)
-            member = perm_data.get("memberId")
-            if member in member_to_role_to_data:
-                role = perm_data.get("roleName")
-                if role not in member_to_role_to_data[member]:
-                    member_to_role_to_data[member][role] = {}
-                member_to_role_to_data[member][role].update(
-                    perm_data["insightSpecificData"]
+            for insight in revoked_policy_insights:
+                member, _, role, insight_record = self._parse_permission_usage_insights(
+                    insight
                 )
+                if member in member_to_role_to_data:
+                    role_to_data = member_to_role_to_data[member]
+                    if role not in role_to_data:
+                        role_to_data[role] = RoleRecommendationRecord()
+                    role_to_data[role].update(insight_record)
 
-        for insight in revoked_service_account_insights:
-            service_account_data = self._parse_service_account_insights(insight)
-            member = service_account_data.get("memberId")
-            member_type = service_account_data.get("memberType")
-            insight_data = service_account_data.get("insightSpecificData")
-            if member in member_to_role_to_data:
-                member_to_overall_values[member]["insightSubtypes"].append(
-                    "SERVICE ACCOUNT USAGE"
+            for insight in revoked_service_account_insights:
+                member, member_type, insight_record = (
+                    self._parse_service_account_insights(insight)
                 )
-                member_to_overall_values[member]["lastRefreshTime"] = insight_data[
-                    "lastRefreshTime"
-                ]
-            else:
-                member_to_role_to_data[member] = {}
-                service_account_data["priority"] = "P4"
-                member_to_overall_values[member] = {
-                    "_priority_count": 1,
-                    "_priority_sum": 4,
-                    "insightSubtypes": ["SERVICE ACCOUNT USAGE"],
-                    "memberType": member_type,
-                }
-            member_to_role_to_data[member]["serviceAccount"] = insight_data
-
-        for member in member_to_role_to_data:
-            avg_priority = member_to_overall_values[member].pop(
-                "_priority_sum"
-            ) / member_to_overall_values[member].pop("_priority_count")
-            member_to_overall_values[member]["priority"] = (
-                self.converter._convert_avg_priority_to_priority(avg_priority)
-            )
-            data = {
-                "serviceAccountRecommendation": member_to_role_to_data[member].pop(
-                    "serviceAccount", {}
-                ),
-                "roleRecommendations": [
-                    member_to_role_to_data[member][role]
-                    for role in member_to_role_to_data[member]
-                ],
-                "memberType": member_to_overall_values[member].pop("memberType"),
-                "category": "SECURITY",
-                "product": "IAM",
-                "productCategory": "Access Management",
-                "insightSubtypes": member_to_overall_values[member].pop(
-                    "insightSubtypes"
-                ),
-                "overallValues": member_to_overall_values[member],
-            }
-            try:
-                cloud_services.append(
-                    make_cloud_service(
-                        name=member,
-                        cloud_service_type=self.cloud_service_type,
-                        cloud_service_group=self.cloud_service_group,
-                        provider=self.provider,
-                        account=self.project_id,
-                        data=data,
-                        region_code="global",
-                        instance_type="",
-                        instance_size=0,
-                        reference={
-                            "resource_id": member,
-                            "external_link": f"https://console.cloud.google.com/active-assist/list/security/recommendations?project={self.project_id}",
-                        },
+                if member in member_to_role_to_data:
+                    member_to_overall_values[member]["insightSubtypes"].append(
+                        "SERVICE ACCOUNT USAGE"
                     )
+                    member_to_overall_values[member][
+                        "lastRefreshTime"
+                    ] = insight_record.last_refresh_time
+                else:
+                    member_to_role_to_data[member] = {}
+                    member_to_overall_values[member] = {
+                        "_priority_count": 1,
+                        "_priority_sum": 4,
+                        "insightSubtypes": ["SERVICE ACCOUNT USAGE"],
+                        "memberType": member_type,
+                    }
+                member_to_role_to_data[member]["serviceAccount"] = insight_record
+
+        # Members are complete once every source is merged; hand each one over
+        # and drop it so only the not yet emitted members stay in memory.
+        for member in list(member_to_role_to_data):
+            with measure_phase("aggregation", trace=False):
+                role_to_data = member_to_role_to_data.pop(member)
+                overall_values = member_to_overall_values.pop(member)
+                avg_priority = overall_values.pop("_priority_sum") / overall_values.pop(
+                    "_priority_count"
                 )
-            except Exception as e:
-                error_responses.append(
-                    make_error_response(
-                        error=e,
-                        provider=self.provider,
-                        cloud_service_group=self.cloud_service_group,
-                        cloud_service_type=self.cloud_service_type,
-                    )
+                overall_values["priority"] = (
+                    self.converter._convert_avg_priority_to_priority(avg_priority)
                 )
-        return cloud_services, error_responses
+                service_account_record = role_to_data.pop("serviceAccount", None)
+                data = {
+                    "serviceAccountRecommendation": (
+                        service_account_record.to_dict()
+                        if service_account_record
+                        else {}
+                    ),
+                    "roleRecommendations": [
+                        record.to_dict() for record in role_to_data.values()
+                    ],
+                    "memberType": overall_values.pop("memberType"),
+                    "category": "SECURITY",
+                    "product": "IAM",
+                    "productCategory": "Access Management",
+                    "insightSubtypes": overall_values.pop("insightSubtypes"),
+                    "overallValues": overall_values,
+                }
+                response = self.make_cloud_service_response(
+                    name=member,
+                    account=self.project_id,
+                    data=data,
+                    region_code="global",
+                    instance_type="",
+                    instance_size=0,
+                    reference={
+                        "resource_id": member,
+                        "external_link": f"https://console.cloud.google.com/active-assist/list/security/recommendations?project={self.project_id}",
+                    },
+                )
+            yield response
 
     def list_recommendations(self, options, secret_data, schema) -> list:
-        rec_parents = self._list_recommendation_parents()
+        rec_parents = self._list_recommendation_parents(CollectFilter(options))
         recommendation_conn = RecommendationConnector(
             options=options, secret_data=secret_data, schema=schema
         )
         recs = []
+        if options.get("batch_requests"):
+            for parent, parent_recs, error in recommendation_conn.list_recommendations_in_batch(
+                rec_parents, fields=IAM_RECOMMENDATION_FIELDS
+            ):
+                if error is not None and not is_forbidden_error(error):
+                    raise error
+                recs.extend(parent_recs)
+            return recs
+
         for parent in rec_parents:
-            recs.extend(recommendation_conn.list_recommendations(parent))
+            recs.extend(
+                recommendation_conn.list_recommendations(
+                    parent, fields=IAM_RECOMMENDATION_FIELDS
+                )
+            )
         return recs
 
-    def _list_recommendation_parents(self) -> list:
+    def _list_recommendation_parents(self, collect_filter: CollectFilter = None) -> list:
+        if not self._is_selected(collect_filter or CollectFilter()):
+            return []
+
         rec_parents = []
-        rec_id = "google.iam.policy.Recommender"
+        rec_id = IAM_RECOMMENDER_ID
         if self.organization_id:
             rec_parents.append(
                 f"organizations/{self.organization_id}/locations/global/recommenders/{rec_id}"
@@ -208,28 +268,29 @@ class IAMManagementRecommendationManager(ResourceManager):
             )
         return rec_parents
 
-    def _parse_recommendation(self, rec: dict) -> dict:
+    def _parse_recommendation(
+        self, rec: dict
+    ) -> (str, str, str, RoleRecommendationRecord):
         overview = rec.get("content", {}).get("overview", {})
         member = overview.get("member", ":")
         member_id = member.split(":")[1]
         member_type = member.split(":")[0].upper()
         if member_type == "SERVICEACCOUNT":
             member_type = "SERVICE ACCOUNT"
-        data = {
-            "memberType": member_type,
-            "memberId": member_id,
-            "roleName": overview.get("removedRole"),
-            "unusedPermissionsCount": rec.get("primaryImpact", {})
+        record = RoleRecommendationRecord(
+            unused_permissions_count=rec.get("primaryImpact", {})
             .get("securityProjection", {})
             .get("details", {})
             .get("revokedIamPermissionsCount", 0),
-            "lastRefreshTime": rec.get("lastRefreshTime"),
-            "priority": rec.get("priority"),
-            "insightId": rec.get("associatedInsights", [{}])[0].get("insight"),
-        }
-        return data
+            last_refresh_time=rec.get("lastRefreshTime"),
+            priority=intern_value(rec.get("priority")),
+            insight_id=rec.get("associatedInsights", [{}])[0].get("insight"),
+        )
+        return member_id, intern_value(member_type), overview.get("removedRole"), record
 
-    def _parse_permission_usage_insights(self, insight: dict) -> dict:
+    def _parse_permission_usage_insights(
+        self, insight: dict
+    ) -> (str, str, str, RoleRecommendationRecord):
         content = insight.get("content", {})
         member = content.get("member", ":")
         member_type, member_id = member.split(":")
@@ -239,62 +300,70 @@ class IAMManagementRecommendationManager(ResourceManager):
         observation_period_in_days = round(int(observation_period_in_sec[:-1]) / 86400)
         role_name = content.get("role")
 
-        all_perms = set(self.all_roles_to_permissions.get(role_name, []))
-        _exercised_perms_dict = content.get("exercisedPermissions", [])
-
-        exercised_perms = [perm.get("permission") for perm in _exercised_perms_dict]
-        unused_permissions = all_perms.difference(set(exercised_perms))
-
+        all_perm_ids = self.all_roles_to_permission_ids.get(role_name, frozenset())
+        exercised_perms = [
+            perm.get("permission") for perm in content.get("exercisedPermissions", [])
+        ]
+        unused_perm_ids = array(
+            "I",
+            sorted(all_perm_ids.difference(PermissionIndex.lookup(exercised_perms))),
+        )
         inferred_perms = [
             perm.get("permission") for perm in content.get("inferredPermissions", [])
         ]
-        data = {
-            "memberType": member_type,
-            "memberId": member_id,
-            "roleName": role_name,
-            "insightSpecificData": {
-                "roleName": role_name,
-                "insightId": insight.get("name"),
-                "unusedPermissions": list(unused_permissions),
-                "exercisedPermissions": exercised_perms,
-                "exercisedPermissionsCount": len(
-                    content.get("exercisedPermissions", [])
-                ),
-                "inferredPermissions": inferred_perms,
-                "inferredPermissionsCount": len(inferred_perms),
-                "currentTotalPermissionsCount": content.get(
-                    "currentTotalPermissionsCount", 0
-                ),
-                "observationPeriod": observation_period_in_days,
-            },
-        }
-        return data
+        record = RoleRecommendationRecord(
+            role_name=role_name,
+            insight_id=insight.get("name"),
+            unused_permission_ids=unused_perm_ids,
+            exercised_permissions=exercised_perms,
+            exercised_permissions_count=len(exercised_perms),
+            inferred_permissions=inferred_perms,
+            inferred_permissions_count=len(inferred_perms),
+            current_total_permissions_count=content.get(
+                "currentTotalPermissionsCount", 0
+            ),
+            observation_period=observation_period_in_days,
+        )
+        return member_id, member_type, role_name, record
 
-    def _parse_service_account_insights(self, insight: dict) -> dict:
+    def _parse_service_account_insights(
+        self, insight: dict
+    ) -> (str, str, ServiceAccountInsightRecord):
         content = insight.get("content", {})
         observation_period_in_sec = insight.get("observationPeriod")
         observation_period_in_days = round(int(observation_period_in_sec[:-1]) / 86400)
-        data = {
-            "memberType": "SERVICE ACCOUNT",
-            "memberId": content.get("email"),
-            "insightSpecificData": {
-                "insightId": insight.get("name"),
-                "lastAuthenticatedTime": content.get("lastAuthenticatedTime"),
-                "lastRefreshTime": insight.get("lastRefreshTime"),
-                "observationPeriod": observation_period_in_days,
-            },
-        }
-        return data
+        record = ServiceAccountInsightRecord(
+            insight_id=insight.get("name"),
+            last_authenticated_time=content.get("lastAuthenticatedTime"),
+            last_refresh_time=insight.get("lastRefreshTime"),
+            observation_period=observation_period_in_days,
+        )
+        return content.get("email"), "SERVICE ACCOUNT", record
 
     def _list_insights(self, options, secret_data, schema) -> (list, list):
         insight_connector = InsightConnector(
             options=options, secret_data=secret_data, schema=schema
         )
         insight_parent = f"projects/{self.project_id}/locations/global/insightTypes/"
+        insight_parents = [
+            insight_parent + "google.iam.policy.Insight",
+            insight_parent + "google.iam.serviceAccount.Insight",
+        ]
+        if options.get("batch_requests"):
+            insights = []
+            for parent, parent_insights, error in insight_connector.list_insights_in_batch(
+                insight_parents, fields=IAM_INSIGHT_FIELDS
+            ):
+                if error is not None and not is_forbidden_error(error):
+                    raise error
+                insights.append(parent_insights)
+            revoked_policy_insights, revoked_service_account_insights = insights
+            return revoked_policy_insights, revoked_service_account_insights
+
         revoked_policy_insights = insight_connector.list_insights(
-            insight_parent + "google.iam.policy.Insight"
+            insight_parents[0], fields=IAM_INSIGHT_FIELDS
         )
         revoked_service_account_insights = insight_connector.list_insights(
-            insight_parent + "google.iam.serviceAccount.Insight"
+            insight_parents[1], fields=IAM_INSIGHT_FIELDS
         )
         return revoked_policy_insights, revoked_service_account_insights
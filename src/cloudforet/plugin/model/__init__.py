@@ -0,0 +1,3 @@
+from cloudforet.plugin.model.base import Record, intern_value
+from cloudforet.plugin.model.recommendation import RecommendationRecord
+from cloudforet.plugin.model.iam import RoleRecommendationRecord, ServiceAccountInsightRecord
@@ -0,0 +1,94 @@
+import sys
+
+__all__ = ["Record", "intern_value", "slots_of"]
+
+_UNSET = object()
+
+
+def intern_value(value):
+    """Interns enum-like strings (state, priority, location, ...) shared by many records"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def slots_of(fields: tuple) -> tuple:
+    return tuple(slot for slot, _ in fields)
+
+
+class Record(object):
+    """
+    Compact record of a parsed API item, converted to its API dict by to_dict().
+
+    Subclasses declare `_fields` as (slot, key) pairs and `__slots__ =
+    slots_of(_fields)`. A slot that was never assigned is left out of the dict,
+    so records can be built up from several sources like the dicts they replace.
+    Keys without a slot (e.g. from category hooks) are kept in `extra`.
+    """
+
+    __slots__ = ("extra",)
+    _fields = ()
+    _slot_by_key = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._slot_by_key = {key: slot for slot, key in cls._fields}
+
+    def __init__(self, **values):
+        for slot, value in values.items():
+            setattr(self, slot, value)
+
+    def __getitem__(self, key: str):
+        slot = self._slot_by_key.get(key)
+        if slot is None:
+            return self._get_extra()[key]
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        slot = self._slot_by_key.get(key)
+        if slot is None:
+            self._get_extra()[key] = value
+        else:
+            setattr(self, slot, value)
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, other):
+        """Copies the assigned slots of another record of the same type"""
+        for slot, _ in self._fields:
+            value = getattr(other, slot, _UNSET)
+            if value is not _UNSET:
+                setattr(self, slot, value)
+        other_extra = getattr(other, "extra", None)
+        if other_extra:
+            self._get_extra().update(other_extra)
+
+    def to_dict(self) -> dict:
+        data = {}
+        for slot, key in self._fields:
+            value = getattr(self, slot, _UNSET)
+            if value is not _UNSET:
+                data[key] = value
+        extra = getattr(self, "extra", None)
+        if extra:
+            data.update(extra)
+        return data
+
+    def _get_extra(self) -> dict:
+        try:
+            return self.extra
+        except AttributeError:
+            self.extra = {}
+            return self.extra
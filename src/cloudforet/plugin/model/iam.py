@@ -0,0 +1,48 @@
+from cloudforet.plugin.model.base import Record, slots_of
+from cloudforet.plugin.utils.permission_index import PermissionIndex
+
+__all__ = ["RoleRecommendationRecord", "ServiceAccountInsightRecord"]
+
+
+class RoleRecommendationRecord(Record):
+    """
+    Role of a member, from an IAM policy recommendation and/or its permission
+    usage insight. Unused permissions are kept as an array of PermissionIndex
+    ids until to_dict().
+    """
+
+    _fields = (
+        ("unused_permissions_count", "unusedPermissionsCount"),
+        ("last_refresh_time", "lastRefreshTime"),
+        ("priority", "priority"),
+        ("insight_id", "insightId"),
+        ("role_name", "roleName"),
+        ("unused_permission_ids", "unusedPermissions"),
+        ("exercised_permissions", "exercisedPermissions"),
+        ("exercised_permissions_count", "exercisedPermissionsCount"),
+        ("inferred_permissions", "inferredPermissions"),
+        ("inferred_permissions_count", "inferredPermissionsCount"),
+        ("current_total_permissions_count", "currentTotalPermissionsCount"),
+        ("observation_period", "observationPeriod"),
+    )
+    __slots__ = slots_of(_fields)
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        if "unusedPermissions" in data:
+            data["unusedPermissions"] = PermissionIndex.decode_ordered(
+                data["unusedPermissions"]
+            )
+        return data
+
+
+class ServiceAccountInsightRecord(Record):
+    """Service account usage insight of a member"""
+
+    _fields = (
+        ("insight_id", "insightId"),
+        ("last_authenticated_time", "lastAuthenticatedTime"),
+        ("last_refresh_time", "lastRefreshTime"),
+        ("observation_period", "observationPeriod"),
+    )
+    __slots__ = slots_of(_fields)
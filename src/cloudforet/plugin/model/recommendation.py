@@ -0,0 +1,24 @@
+from cloudforet.plugin.model.base import Record, slots_of
+
+__all__ = ["RecommendationRecord"]
+
+
+class RecommendationRecord(Record):
+    """One recommendation of the All Recommendations cloud services"""
+
+    _fields = (
+        ("name", "name"),
+        ("category", "category"),
+        ("long_description", "longDescription"),
+        ("subtype", "subtype"),
+        ("resource", "resource"),
+        ("state", "state"),
+        ("associated_insights", "associatedInsights"),
+        ("priority", "priority"),
+        ("last_refresh_time", "lastRefreshTime"),
+        ("impact", "impact"),
+        ("short_description", "shortDescription"),
+        ("recommender_name", "recommenderName"),
+        ("location", "location"),
+    )
+    __slots__ = slots_of(_fields)
@@ -0,0 +1,57 @@
+import re
+
+__all__ = ["CollectFilter"]
+
+_ZONE_PATTERN = re.compile(r"(.+-\w+\d)-[a-z]")
+
+
+class CollectFilter(object):
+    """
+    Selection made by the collect options. Managers, recommenders and locations
+    left out are dropped before any request is sent for them.
+
+    options
+        - managers: ["AllRecommendationsManager", ...]
+        - recommender_ids: ["google.compute.instance.IdleResourceRecommender", ...]
+        - recommender_categories: ["Cost", "Security", ...]
+        - locations: ["global", "us-central1", ...] (a region selects its zones)
+    """
+
+    def __init__(self, options: dict = None):
+        options = options or {}
+        self.managers = self._get_values(options, "managers")
+        self.recommender_ids = self._get_values(options, "recommender_ids")
+        self.recommender_categories = {
+            category.lower()
+            for category in self._get_values(options, "recommender_categories")
+        }
+        self.locations = self._get_values(options, "locations")
+
+    @staticmethod
+    def _get_values(options: dict, key: str) -> set:
+        values = options.get(key) or []
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, (list, tuple)) or not all(
+            isinstance(value, str) for value in values
+        ):
+            raise ValueError(f"{key} must be a list of strings")
+        return set(values)
+
+    def accepts_manager(self, manager) -> bool:
+        return not self.managers or manager.__name__ in self.managers
+
+    def accepts_recommender(self, recommender_id: str, category: str = None) -> bool:
+        if self.recommender_ids and recommender_id not in self.recommender_ids:
+            return False
+        if self.recommender_categories and (
+            (category or "").lower() not in self.recommender_categories
+        ):
+            return False
+        return True
+
+    def accepts_location(self, location: str) -> bool:
+        if not self.locations or location in self.locations:
+            return True
+        zone = _ZONE_PATTERN.fullmatch(location)
+        return zone is not None and zone.group(1) in self.locations
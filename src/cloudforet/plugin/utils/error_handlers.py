@@ -1,12 +1,68 @@
+import inspect
+
+from googleapiclient.errors import HttpError
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+QUOTA_EXCEEDED_REASONS = (
+    b"RESOURCE_EXHAUSTED",
+    b"rateLimitExceeded",
+    b"userRateLimitExceeded",
+    b"quotaExceeded",
+)
+
+
+def is_quota_exceeded_error(e: Exception) -> bool:
+    """Quota errors come as 429 or as a 403 with a RESOURCE_EXHAUSTED reason"""
+    if not isinstance(e, HttpError):
+        return False
+    if e.resp.status == 429:
+        return True
+    content = e.content or b""
+    return e.resp.status == 403 and any(
+        reason in content for reason in QUOTA_EXCEEDED_REASONS
+    )
+
+
+def is_forbidden_error(e: Exception) -> bool:
+    return "403" in str(e) and not is_quota_exceeded_error(e)
+
+
+def is_authentication_error(e: Exception) -> bool:
+    """The secret was rejected: its token could not be minted, or a 401/403"""
+    from google.auth.exceptions import RefreshError
+
+    if isinstance(e, RefreshError):
+        return True
+    if isinstance(e, HttpError) and e.resp.status == 401:
+        return True
+    return is_forbidden_error(e)
+
+
+def is_retryable_error(e: Exception) -> bool:
+    if isinstance(e, HttpError):
+        return e.resp.status in RETRYABLE_STATUS_CODES or is_quota_exceeded_error(e)
+    return isinstance(e, (ConnectionError, TimeoutError))
+
+
 def handle_403_exception(default_response=[]):
     def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            def generator_wrapper(*args, **kwargs):
+                try:
+                    yield from func(*args, **kwargs)
+                except Exception as e:
+                    if is_forbidden_error(e):
+                        yield from default_response
+                        return
+                    raise e
+            return generator_wrapper
+
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                if "403" in str(e):
+                if is_forbidden_error(e):
                     return default_response
                 raise e
         return wrapper
     return decorator
-
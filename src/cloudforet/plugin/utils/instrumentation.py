@@ -0,0 +1,273 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cloudforet.plugin.config.global_conf import (
+    METRICS_REGISTRY_ENABLED,
+    METRICS_REGISTRY_HISTORY,
+)
+from cloudforet.plugin.utils.tracing import Tracer
+
+__all__ = [
+    "CollectMetrics",
+    "MetricsRegistry",
+    "bind_context",
+    "manager_scope",
+    "measure_iter",
+    "measure_phase",
+    "record_metric",
+]
+
+_LOGGER = logging.getLogger("spaceone")
+
+_COLLECT_METRICS = contextvars.ContextVar("collect_metrics", default=None)
+_PHASE_FRAME = contextvars.ContextVar("phase_frame", default=None)
+
+OTHER_PHASE = "other"
+
+
+class _PhaseFrame(object):
+    __slots__ = ("manager", "phase", "parent", "thread_id", "child_time")
+
+    def __init__(self, manager: str, phase: str = None, parent=None):
+        self.manager = manager
+        self.phase = phase
+        self.parent = parent
+        self.thread_id = threading.get_ident()
+        self.child_time = 0.0
+
+
+class PhaseMetrics(object):
+    def __init__(self):
+        self.duration = 0.0
+        self.counters = {}
+
+    def add(self, counter: str, amount=1, service: str = None):
+        if service is None:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+        else:
+            by_service = self.counters.setdefault(counter, {})
+            by_service[service] = by_service.get(service, 0) + amount
+
+    def to_dict(self) -> dict:
+        return dict(self.counters, duration=round(self.duration, 6))
+
+
+class CollectMetrics(object):
+    """
+    Metrics of one collect, grouped by manager and phase.
+
+    Phase durations are exclusive: time spent in a nested phase of the same
+    thread is not counted in the outer phase. Counters recorded in worker
+    threads go to the phase that submitted the work (see bind_context).
+    """
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.started_at = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases = {}
+        self._manager_durations = {}
+        self.span = Tracer.start_span("collect", **labels)
+
+    def add(
+        self,
+        manager: str,
+        phase: str,
+        duration: float = 0.0,
+        counter: str = None,
+        amount=1,
+        service: str = None,
+    ):
+        with self._lock:
+            phase_metrics = self._phases.setdefault(manager, {}).get(phase)
+            if phase_metrics is None:
+                phase_metrics = self._phases[manager][phase] = PhaseMetrics()
+            phase_metrics.duration += duration
+            if counter:
+                phase_metrics.add(counter, amount, service)
+
+    def set_manager_duration(self, manager: str, duration: float):
+        with self._lock:
+            self._manager_durations[manager] = duration
+
+    def finish(self) -> dict:
+        """Logs the summary as one record and hands it to the metrics registry"""
+        self.duration = time.perf_counter() - self._started
+        Tracer.end_span(self.span)
+        summary = self.summary()
+        _LOGGER.info(
+            f"[collect_summary] {json.dumps(summary, sort_keys=True, default=str)}"
+        )
+        if METRICS_REGISTRY_ENABLED:
+            MetricsRegistry.record(summary)
+        return summary
+
+    def summary(self) -> dict:
+        with self._lock:
+            managers = {}
+            for manager, phases in self._phases.items():
+                managers[manager] = {
+                    "duration": round(self._manager_durations.get(manager, 0.0), 6),
+                    "phases": {
+                        phase: phase_metrics.to_dict()
+                        for phase, phase_metrics in phases.items()
+                    },
+                }
+        return {
+            "labels": self.labels,
+            "started_at": self.started_at,
+            "duration": round(self.duration or time.perf_counter() - self._started, 6),
+            "managers": managers,
+            "totals": _sum_phases(
+                phase
+                for manager in managers.values()
+                for phase in manager["phases"].values()
+            ),
+        }
+
+
+class MetricsRegistry(object):
+    """
+    In-process aggregate of the collect summaries (METRICS_REGISTRY_ENABLED).
+
+    Counters and durations are summed per manager/phase/metric, and the latest
+    summaries are kept for inspection.
+    """
+
+    _lock = threading.Lock()
+    _totals = {}
+    _summaries = deque(maxlen=METRICS_REGISTRY_HISTORY)
+    _collects = 0
+
+    @classmethod
+    def record(cls, summary: dict):
+        with cls._lock:
+            cls._collects += 1
+            cls._summaries.append(summary)
+            for manager, manager_summary in summary["managers"].items():
+                for phase, values in manager_summary["phases"].items():
+                    for metric, value in _flatten(values):
+                        key = f"{manager}.{phase}.{metric}"
+                        cls._totals[key] = cls._totals.get(key, 0) + value
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            return {
+                "collects": cls._collects,
+                "totals": dict(cls._totals),
+                "summaries": list(cls._summaries),
+            }
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._collects = 0
+            cls._totals.clear()
+            cls._summaries.clear()
+
+
+def _flatten(values: dict, prefix: str = ""):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def _sum_phases(phases) -> dict:
+    totals = {}
+    for values in phases:
+        for metric, value in _flatten(values):
+            totals[metric] = round(totals.get(metric, 0) + value, 6)
+    return totals
+
+
+@contextmanager
+def manager_scope(collect_metrics: CollectMetrics, manager: str):
+    """Binds the metrics of a manager to the current thread"""
+    collect_token = _COLLECT_METRICS.set(collect_metrics)
+    frame_token = _PHASE_FRAME.set(_PhaseFrame(manager))
+    started = time.perf_counter()
+    try:
+        with Tracer.span("manager", collect_metrics.span, manager=manager):
+            yield
+    finally:
+        collect_metrics.set_manager_duration(manager, time.perf_counter() - started)
+        _PHASE_FRAME.reset(frame_token)
+        _COLLECT_METRICS.reset(collect_token)
+
+
+@contextmanager
+def measure_phase(phase: str, trace: bool = True):
+    """Counts the time spent in the block in `phase`, traced as a span unless `trace` is off"""
+    collect_metrics = _COLLECT_METRICS.get()
+    parent = _PHASE_FRAME.get()
+    if collect_metrics is None or parent is None:
+        yield
+        return
+
+    frame = _PhaseFrame(parent.manager, phase, parent)
+    token = _PHASE_FRAME.set(frame)
+    started = time.perf_counter()
+    try:
+        if trace:
+            with Tracer.span(phase, manager=frame.manager):
+                yield
+        else:
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _PHASE_FRAME.reset(token)
+        collect_metrics.add(frame.manager, phase, duration=elapsed - frame.child_time)
+        if parent.phase and parent.thread_id == frame.thread_id:
+            parent.child_time += elapsed
+
+
+def measure_iter(iterable, phase: str):
+    """Counts the time spent producing each item of `iterable` in `phase`"""
+    iterator = iter(iterable)
+    # One span covers the whole iteration instead of one span per item
+    frame = _PHASE_FRAME.get()
+    span = Tracer.start_span(phase, manager=frame.manager if frame else None)
+    try:
+        while True:
+            with Tracer.use_span(span), measure_phase(phase, trace=False):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        Tracer.end_span(span)
+
+
+def record_metric(counter: str, amount=1, service: str = None):
+    collect_metrics = _COLLECT_METRICS.get()
+    frame = _PHASE_FRAME.get()
+    if collect_metrics is None or frame is None:
+        return
+    collect_metrics.add(
+        frame.manager,
+        frame.phase or OTHER_PHASE,
+        counter=counter,
+        amount=amount,
+        service=service,
+    )
+
+
+def bind_context(func):
+    """Runs `func` in a copy of the current context, e.g. when it is submitted to an executor"""
+    context = contextvars.copy_context()
+
+    def _run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return _run
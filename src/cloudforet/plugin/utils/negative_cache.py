@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from cloudforet.plugin.config.global_conf import (
+    CACHE_DIR,
+    NEGATIVE_CACHE_BASE_INTERVAL,
+    NEGATIVE_CACHE_MAX_INTERVAL,
+    NEGATIVE_CACHE_SAMPLE_RATIO,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class NegativeCache(object):
+    """
+    Persistent record of request parents that were forbidden or empty.
+
+    A dead parent is skipped until its re-probe time, which doubles with every
+    consecutive miss. On top of that, a rotating sample of the skipped parents
+    (the ones checked longest ago) is re-probed on every run.
+    """
+
+    FORBIDDEN = "forbidden"
+    EMPTY = "empty"
+
+    def __init__(self, project_id: str, namespace: str = "recommender_parents"):
+        file_key = hashlib.sha1(f"{namespace}:{project_id}".encode("utf-8")).hexdigest()
+        self.path = os.path.join(CACHE_DIR, "negative_cache", f"{file_key}.json")
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._changes = {}
+
+    def filter_parents(self, parents: list) -> list:
+        now = time.time()
+        skipped = [
+            parent
+            for parent in parents
+            if parent in self._entries and self._entries[parent]["next_probe_at"] > now
+        ]
+        if not skipped:
+            return list(parents)
+
+        sample_size = math.ceil(len(skipped) * NEGATIVE_CACHE_SAMPLE_RATIO)
+        skipped.sort(key=lambda parent: self._entries[parent]["checked_at"])
+        skipped = set(skipped[sample_size:])
+        _LOGGER.debug(
+            f"[filter_parents] skip {len(skipped)} known dead parents (re-probe {sample_size})"
+        )
+        return [parent for parent in parents if parent not in skipped]
+
+    def record(self, parent: str, reason: str = None):
+        """Records the result of a parent, `reason` is None when it had results"""
+        with self._lock:
+            if reason is None:
+                if self._entries.pop(parent, None) is not None:
+                    self._changes[parent] = None
+                return
+
+            misses = self._entries.get(parent, {}).get("misses", 0) + 1
+            interval = min(
+                NEGATIVE_CACHE_MAX_INTERVAL,
+                NEGATIVE_CACHE_BASE_INTERVAL * (2 ** (misses - 1)),
+            )
+            now = time.time()
+            self._entries[parent] = self._changes[parent] = {
+                "reason": reason,
+                "misses": misses,
+                "checked_at": now,
+                "next_probe_at": now + interval,
+            }
+
+    def save(self):
+        with self._lock:
+            changes, self._changes = self._changes, {}
+        if not changes:
+            return
+
+        # Other tasks of the same project may have saved in the meantime, so
+        # only this run's changes are applied on top of the stored entries.
+        entries = self._load()
+        for parent, entry in changes.items():
+            if entry is None:
+                entries.pop(parent, None)
+            else:
+                entries[parent] = entry
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            _LOGGER.debug(f"[save] failed to write negative cache: {e}")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            _LOGGER.debug(f"[_load] ignore broken negative cache: {e}")
+        return {}
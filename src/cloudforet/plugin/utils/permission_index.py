@@ -0,0 +1,45 @@
+from array import array
+import threading
+
+
+class PermissionIndex(object):
+    """
+    Process-wide interning table of IAM permission strings.
+
+    Role permissions are stored as frozensets of integer ids, so unused
+    permissions are computed on small integer sets and decoded to strings only
+    when they are emitted. Only role permissions are interned: permissions
+    reported by insights are looked up, never added, so the table stays the
+    size of the role catalog. Ids are never reused, so cached sets stay valid.
+    """
+
+    _lock = threading.Lock()
+    _ids = {}
+    _names = []
+
+    @classmethod
+    def intern(cls, permission: str) -> int:
+        permission_id = cls._ids.get(permission)
+        if permission_id is None:
+            with cls._lock:
+                permission_id = cls._ids.get(permission)
+                if permission_id is None:
+                    permission_id = len(cls._names)
+                    cls._names.append(permission)
+                    cls._ids[permission] = permission_id
+        return permission_id
+
+    @classmethod
+    def intern_all(cls, permissions) -> frozenset:
+        return frozenset(cls.intern(permission) for permission in permissions)
+
+    @classmethod
+    def lookup(cls, permissions) -> set:
+        """Returns the ids of already interned permissions, ignoring unknown ones"""
+        ids = cls._ids
+        return {ids[permission] for permission in permissions if permission in ids}
+
+    @classmethod
+    def decode_ordered(cls, permission_ids) -> list:
+        names = cls._names
+        return [names[permission_id] for permission_id in permission_ids]
@@ -0,0 +1,256 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from cloudforet.plugin.config.global_conf import TRACE_DIR, TRACE_EXPORTERS
+
+__all__ = [
+    "ChromeTraceExporter",
+    "ConsoleSpanExporter",
+    "FileSpanExporter",
+    "Span",
+    "SpanExporter",
+    "Tracer",
+]
+
+_LOGGER = logging.getLogger("spaceone")
+
+_CURRENT_SPAN = contextvars.ContextVar("current_span", default=None)
+
+
+class Span(object):
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "thread_id",
+        "thread_name",
+        "attributes",
+    )
+
+    def __init__(self, name: str, parent_span=None, **attributes):
+        self.name = name
+        self.trace_id = parent_span.trace_id if parent_span else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_span.span_id if parent_span else None
+        self.start_time = time.time()
+        self.end_time = None
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.attributes = {
+            key: value for key, value in attributes.items() if value is not None
+        }
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.time()) - self.start_time
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def increment(self, key: str, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "thread": self.thread_name,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(object):
+    def export(self, span: Span):
+        raise NotImplementedError
+
+    def end_trace(self, trace_id: str):
+        """Called once the root span of a trace has ended"""
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    def export(self, span: Span):
+        _LOGGER.debug(
+            f"[span] {span.name} {span.duration * 1000:.1f}ms "
+            f"(thread: {span.thread_name}) {json.dumps(span.attributes, default=str)}"
+        )
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends the spans as JSON lines to TRACE_DIR/spans.jsonl"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(TRACE_DIR, "spans.jsonl")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(f"{line}\n")
+
+
+class ChromeTraceExporter(SpanExporter):
+    """
+    Writes every trace to TRACE_DIR/trace-<trace_id>.json in the Chrome trace
+    event format, which chrome://tracing and Perfetto show as a timeline per thread.
+
+    Spans ending after their trace was written (requests of threads that were
+    still running when the collect ended) are dropped.
+    """
+
+    max_ended_traces = 1024
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or TRACE_DIR
+        self._lock = threading.Lock()
+        self._events = {}
+        self._ended_traces = OrderedDict()
+
+    def export(self, span: Span):
+        event = {
+            "name": span.name,
+            "cat": span.attributes.get("api", "collector"),
+            "ph": "X",
+            "ts": span.start_time * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": os.getpid(),
+            "tid": span.thread_name,
+            "args": span.attributes,
+        }
+        with self._lock:
+            if span.trace_id in self._ended_traces:
+                return
+            self._events.setdefault(span.trace_id, []).append(event)
+
+    def end_trace(self, trace_id: str):
+        with self._lock:
+            events = self._events.pop(trace_id, [])
+            self._ended_traces[trace_id] = True
+            if len(self._ended_traces) > self.max_ended_traces:
+                self._ended_traces.popitem(last=False)
+        path = os.path.join(self.directory, f"trace-{trace_id}.json")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events}, f, default=str)
+        _LOGGER.debug(f"[ChromeTraceExporter] trace written to {path}")
+
+
+class Tracer(object):
+    """
+    Optional tracing of a collect: collect > manager > phase > API request spans.
+
+    Tracing is off unless exporters are configured, either by name through
+    RECOMMENDER_COLLECTOR_TRACE_EXPORTERS or with set_exporters().
+    """
+
+    exporter_classes = {
+        "console": ConsoleSpanExporter,
+        "file": FileSpanExporter,
+        "chrome": ChromeTraceExporter,
+    }
+
+    _lock = threading.Lock()
+    _exporters = None
+
+    @classmethod
+    def register_exporter(cls, name: str, exporter_class):
+        cls.exporter_classes[name] = exporter_class
+
+    @classmethod
+    def set_exporters(cls, exporters: list):
+        with cls._lock:
+            cls._exporters = list(exporters)
+
+    @classmethod
+    def get_exporters(cls) -> list:
+        if cls._exporters is None:
+            with cls._lock:
+                if cls._exporters is None:
+                    cls._exporters = cls._create_exporters(TRACE_EXPORTERS)
+        return cls._exporters
+
+    @classmethod
+    def _create_exporters(cls, names: list) -> list:
+        exporters = []
+        for name in names:
+            if name not in cls.exporter_classes:
+                _LOGGER.warning(
+                    f"[Tracer] unknown RECOMMENDER_COLLECTOR_TRACE_EXPORTERS entry {name!r} "
+                    f"skipped, expected one of {sorted(cls.exporter_classes)}"
+                )
+                continue
+            exporters.append(cls.exporter_classes[name]())
+        return exporters
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return bool(cls.get_exporters())
+
+    @classmethod
+    def current_span(cls):
+        return _CURRENT_SPAN.get()
+
+    @classmethod
+    def start_span(cls, name: str, parent_span=None, **attributes):
+        """Starts a span under `parent_span` or the current span, None if disabled"""
+        if not cls.is_enabled():
+            return None
+        return Span(name, parent_span or _CURRENT_SPAN.get(), **attributes)
+
+    @classmethod
+    def end_span(cls, span: Span):
+        if span is None or span.end_time is not None:
+            return
+        span.end_time = time.time()
+        for exporter in cls.get_exporters():
+            try:
+                exporter.export(span)
+                if span.parent_id is None:
+                    exporter.end_trace(span.trace_id)
+            except Exception as e:
+                _LOGGER.debug(f"[Tracer] failed to export span {span.name}: {e}")
+
+    @classmethod
+    @contextmanager
+    def use_span(cls, span: Span):
+        """Makes `span` the current span without ending it"""
+        if span is None:
+            yield span
+            return
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        finally:
+            _CURRENT_SPAN.reset(token)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, parent_span=None, **attributes):
+        span = cls.start_span(name, parent_span, **attributes)
+        if span is None:
+            yield span
+            return
+        try:
+            with cls.use_span(span):
+                yield span
+        except BaseException as e:
+            span.set_attribute("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            cls.end_span(span)
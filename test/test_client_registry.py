@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from cloudforet.plugin.connector.client_registry import ClientRegistry
+from cloudforet.plugin.connector.transport import (
+    HttpTransport,
+    Httplib2Transport,
+    PooledTransport,
+)
+
+
+class TestClientRegistry(unittest.TestCase):
+    def tearDown(self):
+        ClientRegistry.clear()
+        HttpTransport.set_default(None)
+
+    def _get_client_in_thread(self, secret_key: str = "secret"):
+        clients = []
+        thread = threading.Thread(
+            target=lambda: clients.append(
+                ClientRegistry.get_client("recommender", "v1beta1", secret_key, None)
+            )
+        )
+        thread.start()
+        thread.join()
+        return clients[0]
+
+    def test_clients_are_shared_by_threads(self):
+        HttpTransport.set_default(PooledTransport())
+        client = ClientRegistry.get_client("recommender", "v1beta1", "secret", None)
+        self.assertIs(self._get_client_in_thread(), client)
+
+        ClientRegistry.clear()
+        self.assertIsNot(self._get_client_in_thread(), client)
+
+    def test_httplib2_clients_are_per_thread(self):
+        HttpTransport.set_default(Httplib2Transport())
+        client = ClientRegistry.get_client("recommender", "v1beta1", "secret", None)
+        self.assertIs(
+            ClientRegistry.get_client("recommender", "v1beta1", "secret", None), client
+        )
+        self.assertIsNot(self._get_client_in_thread(), client)
+
+    def test_clients_are_evicted(self):
+        HttpTransport.set_default(PooledTransport())
+        max_clients = ClientRegistry.max_clients
+        ClientRegistry.max_clients = 2
+        try:
+            first = ClientRegistry.get_client("recommender", "v1beta1", "a", None)
+            ClientRegistry.get_client("recommender", "v1beta1", "b", None)
+            ClientRegistry.get_client("recommender", "v1beta1", "c", None)
+            self.assertEqual(len(ClientRegistry._clients), 2)
+            self.assertIsNot(
+                ClientRegistry.get_client("recommender", "v1beta1", "a", None), first
+            )
+        finally:
+            ClientRegistry.max_clients = max_clients
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from cloudforet.plugin.utils.collect_filter import CollectFilter
+
+
+class TestCollectFilter(unittest.TestCase):
+    def test_region_selects_its_zones(self):
+        collect_filter = CollectFilter({"locations": ["us-central1"]})
+        self.assertTrue(collect_filter.accepts_location("us-central1"))
+        self.assertTrue(collect_filter.accepts_location("us-central1-a"))
+        self.assertFalse(collect_filter.accepts_location("us-east1"))
+        self.assertFalse(collect_filter.accepts_location("us"))
+
+    def test_multi_region_is_matched_exactly(self):
+        collect_filter = CollectFilter({"locations": ["us"]})
+        self.assertTrue(collect_filter.accepts_location("us"))
+        self.assertFalse(collect_filter.accepts_location("us-central1"))
+        self.assertFalse(collect_filter.accepts_location("us-central1-a"))
+
+    def test_no_locations_accepts_all(self):
+        collect_filter = CollectFilter({})
+        for location in ("global", "us", "us-central1", "us-central1-a"):
+            self.assertTrue(collect_filter.accepts_location(location))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from unittest import mock
+
+from cloudforet.plugin.connector.iam import IAMConnector
+
+
+def _make_connector(secret_key: str, roles: list) -> IAMConnector:
+    connector = IAMConnector.__new__(IAMConnector)
+    connector.secret_key = secret_key
+    connector.list_project_roles = mock.Mock(return_value=roles)
+    connector.list_predefined_roles = mock.Mock(return_value=[])
+    return connector
+
+
+class TestIAMConnector(unittest.TestCase):
+    def test_custom_roles_are_cached_per_secret(self):
+        role = {"name": "projects/p/roles/custom", "includedPermissions": ["a.b.c"]}
+        first = _make_connector("secret-1", [role])
+        second = _make_connector("secret-2", [])
+
+        self.assertEqual(
+            list(first.get_project_roles_to_permission_ids_dict("cache-test")),
+            [role["name"]],
+        )
+        self.assertEqual(second.get_project_roles_to_permission_ids_dict("cache-test"), {})
+        first.get_project_roles_to_permission_ids_dict("cache-test")
+
+        first.list_project_roles.assert_called_once()
+        second.list_project_roles.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from cloudforet.plugin.connector import paginator as paginator_module
+from cloudforet.plugin.connector.base import GoogleCloudConnector
+from cloudforet.plugin.connector.paginator import Paginator
+from cloudforet.plugin.connector.rate_limiter import RateLimiter
+
+
+class StubRequest(object):
+    def __init__(self, collection, query: dict):
+        self.collection = collection
+        self.query = query
+
+    def postproc(self, resp, content):
+        return content
+
+    def execute(self, http=None):
+        return self.collection.respond(self.query)
+
+
+class StubCollection(object):
+    """Three pages per parent: [1], [2], [3]"""
+
+    pages = {
+        None: {"items": [1], "nextPageToken": "page-2"},
+        "page-2": {"items": [2], "nextPageToken": "page-3"},
+        "page-3": {"items": [3]},
+    }
+
+    def __init__(self):
+        self.queries = []
+
+    def list(self, **query):
+        self.queries.append(query)
+        return StubRequest(self, query)
+
+    def respond(self, query: dict) -> dict:
+        return dict(self.pages[query.get("pageToken")])
+
+
+class StubBatch(object):
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        for request_id, request in self.requests:
+            self.callback(request_id, request.execute(http=http), None)
+
+
+class StubClient(object):
+    def new_batch_http_request(self, callback):
+        return StubBatch(callback)
+
+
+def _execute(request, http=None, **span_attributes):
+    return request.execute(http=http)
+
+
+class TestPaginator(unittest.TestCase):
+    def test_items_of_every_page(self):
+        for prefetch in (False, True):
+            collection = StubCollection()
+            paginator = Paginator(
+                collection, _execute, get_http=lambda: None, prefetch=prefetch
+            )
+            self.assertEqual(list(paginator.items("items", parent="p")), [1, 2, 3])
+
+    def test_items_from_a_page_token(self):
+        for prefetch in (False, True):
+            collection = StubCollection()
+            paginator = Paginator(
+                collection, _execute, get_http=lambda: None, prefetch=prefetch
+            )
+            items = paginator.items("items", parent="p", pageToken="page-2")
+            self.assertEqual(list(items), [2, 3])
+            self.assertEqual(
+                [query.get("pageToken") for query in collection.queries],
+                ["page-2", "page-3"],
+            )
+
+    def test_first_page_is_fetched_by_the_caller(self):
+        threads = []
+
+        def _execute_in(request, http=None, **span_attributes):
+            threads.append(threading.current_thread())
+            return request.execute(http=http)
+
+        paginator = Paginator(StubCollection(), _execute_in, get_http=lambda: None)
+        pages = paginator.pages(parent="p")
+        next(pages)
+        pages.close()
+        self.assertEqual(threads[0], threading.current_thread())
+
+    def test_busy_pool_does_not_block_the_caller(self):
+        release = threading.Event()
+        busy_pool = ThreadPoolExecutor(max_workers=1)
+        busy_pool.submit(release.wait)
+        try:
+            with mock.patch.object(paginator_module, "_PREFETCH_EXECUTOR", busy_pool):
+                paginator = Paginator(StubCollection(), _execute, get_http=lambda: None)
+                self.assertEqual(list(paginator.items("items", parent="p")), [1, 2, 3])
+        finally:
+            release.set()
+            busy_pool.shutdown()
+
+
+class TestListInBatch(unittest.TestCase):
+    def setUp(self):
+        self.connector = GoogleCloudConnector.__new__(GoogleCloudConnector)
+        self.connector.page_size = None
+        self.connector.rate_limiter = RateLimiter.get("test")
+        self.connector.secret_key = None
+        self.connector.credentials = None
+        self.connector._get_thread_http = lambda: None
+
+    def test_parent_with_three_pages(self):
+        collection = StubCollection()
+        with mock.patch.object(
+            GoogleCloudConnector, "client", new=StubClient()
+        ):
+            results = list(
+                self.connector.list_in_batch(collection, "items", ["p1", "p2"])
+            )
+
+        self.assertEqual(
+            [(parent, items, error) for parent, items, error in results],
+            [("p1", [1, 2, 3], None), ("p2", [1, 2, 3], None)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from cloudforet.plugin.utils.permission_index import PermissionIndex
+
+
+class TestPermissionIndex(unittest.TestCase):
+    def test_lookup_does_not_intern(self):
+        role_ids = PermissionIndex.intern_all(["test.roles.get", "test.roles.list"])
+        size = len(PermissionIndex._names)
+
+        exercised_ids = PermissionIndex.lookup(["test.roles.get", "test.unknown.get"])
+
+        self.assertEqual(len(PermissionIndex._names), size)
+        self.assertNotIn("test.unknown.get", PermissionIndex._ids)
+        self.assertEqual(
+            PermissionIndex.decode_ordered(sorted(role_ids - exercised_ids)),
+            ["test.roles.list"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cloudforet.plugin.utils import tracing
+from cloudforet.plugin.utils.tracing import (
+    ChromeTraceExporter,
+    ConsoleSpanExporter,
+    Tracer,
+)
+
+
+class TestChromeTraceExporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.exporter = ChromeTraceExporter(self.directory.name)
+        Tracer.set_exporters([self.exporter])
+
+    def tearDown(self):
+        Tracer.set_exporters([])
+        self.directory.cleanup()
+
+    def _read_trace(self, trace_id: str) -> list:
+        path = os.path.join(self.directory.name, f"trace-{trace_id}.json")
+        with open(path) as f:
+            return [event["name"] for event in json.load(f)["traceEvents"]]
+
+    def test_trace_is_written_when_the_root_span_ends(self):
+        with Tracer.span("collect") as root:
+            with Tracer.span("manager"):
+                pass
+        self.assertEqual(self._read_trace(root.trace_id), ["manager", "collect"])
+        self.assertEqual(self.exporter._events, {})
+
+    def test_late_spans_are_dropped(self):
+        root = Tracer.start_span("collect")
+        late_span = Tracer.start_span("list", root)
+        Tracer.end_span(root)
+        Tracer.end_span(late_span)
+
+        self.assertEqual(self._read_trace(root.trace_id), ["collect"])
+        self.assertEqual(self.exporter._events, {})
+
+
+class TestTracer(unittest.TestCase):
+    def tearDown(self):
+        Tracer.set_exporters([])
+
+    def test_unknown_exporter_is_skipped(self):
+        Tracer._exporters = None
+        with mock.patch.object(tracing, "TRACE_EXPORTERS", ["unknown", "console"]):
+            with self.assertLogs(tracing._LOGGER, "WARNING"):
+                exporters = Tracer.get_exporters()
+        self.assertEqual([type(exporter) for exporter in exporters], [ConsoleSpanExporter])
+
+
+if __name__ == "__main__":
+    unittest.main()
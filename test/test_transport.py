@@ -0,0 +1,70 @@
+import gzip
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+from cloudforet.plugin.connector import transport
+from cloudforet.plugin.connector.transport import HttpTransport, PooledTransport
+
+
+class TestPooledTransport(unittest.TestCase):
+    def test_threads_share_the_pool_not_the_session(self):
+        pooled = PooledTransport()
+        session = pooled.get_session()
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(pooled.get_session()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(pooled.get_session(), session)
+        self.assertIsNot(sessions[0], session)
+        self.assertIs(
+            sessions[0].get_adapter("https://example.com"),
+            session.get_adapter("https://example.com"),
+        )
+
+    def test_compressed_response_reports_its_wire_size(self):
+        body = b'{"items": []}' * 100
+        compressed = gzip.compress(body)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(compressed)))
+                self.end_headers()
+                self.wfile.write(compressed)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/"
+            response, content = PooledTransport().get_http().request(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertEqual(content, body)
+        self.assertEqual(response["content-length"], str(len(body)))
+        self.assertEqual(response["-content-length"], str(len(compressed)))
+
+
+class TestHttpTransport(unittest.TestCase):
+    def tearDown(self):
+        HttpTransport.set_default(None)
+
+    def test_unknown_transport(self):
+        HttpTransport.set_default(None)
+        with mock.patch.object(transport, "HTTP_TRANSPORT", "unknown"):
+            with self.assertRaisesRegex(ValueError, "RECOMMENDER_COLLECTOR_HTTP_TRANSPORT"):
+                HttpTransport.get_default()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+
+import httplib2
+from googleapiclient.errors import HttpError
+from spaceone.core import config
+from spaceone.core.error import ERROR_AUTHENTICATE_FAILURE
+
+
+def setUpModule():
+    config.set_default_conf()
+    config.init_conf(package="cloudforet")
+
+
+def _make_manager(error: Exception):
+    class StubManager(object):
+        service = "Stub"
+
+        def verify(self, options, secret_data, schema):
+            raise error
+
+        def warm_up(self, options, secret_data, schema):
+            pass
+
+    return StubManager
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+class TestVerifyManager(unittest.TestCase):
+    def _verify(self, error: Exception):
+        from cloudforet.plugin.main import _verify_manager
+
+        _verify_manager(_make_manager(error), {}, {}, None)
+
+    def test_rejected_secret_is_an_authentication_failure(self):
+        for status in (401, 403):
+            with self.assertRaises(ERROR_AUTHENTICATE_FAILURE):
+                self._verify(_http_error(status))
+
+    def test_other_errors_are_raised_unchanged(self):
+        for error in (_http_error(429), _http_error(503), ConnectionError(), ValueError()):
+            with self.assertRaises(type(error)):
+                self._verify(error)
+
+
+class StubConnector(object):
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = []
+
+    def verify(self, *args):
+        self.calls.append(args)
+        if self.error is not None:
+            raise self.error
+
+
+class TestVerifyOptional(unittest.TestCase):
+    def setUp(self):
+        from cloudforet.plugin.manager import ResourceManager
+
+        self.manager = ResourceManager.__new__(ResourceManager)
+
+    def test_forbidden_api_is_tolerated(self):
+        from cloudforet.plugin.manager import base
+
+        with mock.patch.object(base, "_LOGGER") as logger:
+            self.manager.verify_optional(StubConnector(_http_error(403)))
+        logger.warning.assert_called_once()
+
+    def test_rejected_secret_is_raised(self):
+        with self.assertRaises(HttpError):
+            self.manager.verify_optional(StubConnector(_http_error(401)))
+
+
+class TestAllRecommendationsVerify(unittest.TestCase):
+    def test_probes_a_selected_recommender(self):
+        from cloudforet.plugin.manager.recommender import all_recommendations_manager as module
+
+        recommender_map = {
+            "google.compute.instance.IdleResourceRecommender": {"category": "Cost"},
+            "google.iam.policy.Recommender": {"category": "Security"},
+        }
+        asset_connector = StubConnector(_http_error(403))
+        recommendation_connector = StubConnector()
+        manager = module.AllRecommendationsManager.__new__(module.AllRecommendationsManager)
+        with mock.patch.object(
+            module.RecommenderCatalogConnector,
+            "get_recommender_map",
+            return_value=recommender_map,
+        ), mock.patch.object(
+            module, "CloudAssetConnector", return_value=asset_connector
+        ), mock.patch.object(
+            module, "RecommendationConnector", return_value=recommendation_connector
+        ), mock.patch("cloudforet.plugin.manager.base._LOGGER"):
+            manager.verify({"recommender_categories": ["Cost"]}, {}, None)
+
+        self.assertEqual(
+            recommendation_connector.calls,
+            [("google.compute.instance.IdleResourceRecommender",)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()